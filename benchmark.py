@@ -0,0 +1,291 @@
+# Scaling benchmarks for graph_conversion
+# Times each Circuit stage on synthetic circuits of 10 to 100k components
+# and records peak memory, e.g.
+#   python benchmark.py --sizes 10 100 1000 --output before.json
+#   python benchmark.py --sizes 10 100 1000 --output after.json --compare before.json
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from graph_conversion import Circuit, CircuitComponent
+
+SIZES = (10, 100, 1000, 10000, 100000)
+
+# collects two-terminal components between numbered nodes (node 0 is ground)
+# and turns them into CircuitComponent records
+class CircuitBuilder(object):
+
+    def __init__(self):
+        self._records = []
+        # node -> terminals on it
+        self._nets = [[]]
+
+    def node(self):
+        self._nets.append([])
+        return len(self._nets) - 1
+
+    def add(self, name, label, node1, node2, capacitance=0, inductance=0, subsystem=None):
+        terminals = (name + '_1', name + '_2')
+        self._nets[node1].append(terminals[0])
+        self._nets[node2].append(terminals[1])
+        self._records.append((name, label, terminals,
+            {'capacitance': capacitance, 'inductance': inductance}, subsystem))
+
+    # (name, label, terminals, value, connections, subsystem) per component,
+    # terminals on ground connect to GND, the others to the first terminal
+    # of their node (which connects back to all of them)
+    def records(self):
+        connections = {}
+        for node, terminals in enumerate(self._nets):
+            if not terminals:
+                continue
+            if node == 0:
+                for t in terminals:
+                    connections[t] = ['GND']
+            else:
+                hub = terminals[0]
+                connections[hub] = terminals[1:]
+                for t in terminals[1:]:
+                    connections[t] = [hub]
+        return [(name, label, terminals, value,
+            {t: connections[t] for t in terminals}, subsystem)
+            for name, label, terminals, value, subsystem in self._records]
+
+
+# transmons (junction + shunt capacitor to ground) in a row,
+# neighbours coupled by a capacitor
+def transmon_array(size):
+    builder = CircuitBuilder()
+    previous = None
+    for q in range(max(1, size // 3)):
+        node = builder.node()
+        subsystem = 'transmon_' + str(q)
+        builder.add('J' + str(q), 'junction', node, 0, 2, 10, subsystem)
+        builder.add('Cq' + str(q), 'capacitor', node, 0, 90, 0, subsystem)
+        if previous is not None:
+            builder.add('Cc' + str(q), 'capacitor', previous, node, 5, 0, 'couplers')
+        previous = node
+    return builder.records()
+
+
+# square lattice of transmons, each coupled to its right and lower neighbour
+def coupler_lattice(size):
+    builder = CircuitBuilder()
+    side = max(1, int(math.sqrt(size / 4)))
+    nodes = [[builder.node() for col in range(side)] for row in range(side)]
+    for row in range(side):
+        for col in range(side):
+            node = nodes[row][col]
+            site = str(row) + '_' + str(col)
+            subsystem = 'transmon_' + site
+            builder.add('J' + site, 'junction', node, 0, 2, 10, subsystem)
+            builder.add('Cq' + site, 'capacitor', node, 0, 90, 0, subsystem)
+            if col + 1 < side:
+                builder.add('Ch' + site, 'capacitor', node, nodes[row][col + 1], 5, 0, 'couplers')
+            if row + 1 < side:
+                builder.add('Cv' + site, 'capacitor', node, nodes[row + 1][col], 5, 0, 'couplers')
+    return builder.records()
+
+
+# series chain of alternating inductors and capacitors starting at ground
+def lc_chain(size):
+    builder = CircuitBuilder()
+    previous = 0
+    for i in range(max(1, size)):
+        node = builder.node()
+        if i % 2:
+            builder.add('C' + str(i), 'capacitor', previous, node, 10, 0, 'chain')
+        else:
+            builder.add('L' + str(i), 'inductor', previous, node, 0, 20, 'chain')
+        previous = node
+    return builder.records()
+
+
+# banks of width capacitors/junctions in parallel to ground,
+# consecutive banks coupled by a capacitor
+def parallel_bank(size, width=100):
+    builder = CircuitBuilder()
+    width = max(1, min(width, size))
+    previous = None
+    for b in range(max(1, size // (width + 1))):
+        node = builder.node()
+        subsystem = 'bank_' + str(b)
+        for i in range(width):
+            name = str(b) + '_' + str(i)
+            if i % 2:
+                builder.add('J' + name, 'junction', node, 0, 1, 10, subsystem)
+            else:
+                builder.add('C' + name, 'capacitor', node, 0, 10, 0, subsystem)
+        if previous is not None:
+            builder.add('Cc' + str(b), 'capacitor', previous, node, 5, 0, 'couplers')
+        previous = node
+    return builder.records()
+
+
+# star of resonators to ground whose ground terminals also connect to each other,
+# so most unions land on the ground net
+def grounded_nets(size):
+    builder = CircuitBuilder()
+    hub = builder.node()
+    for i in range(max(1, size // 2)):
+        node = builder.node()
+        builder.add('L' + str(i), 'inductor', node, 0, 0, 20, 'resonator_' + str(i))
+        builder.add('C' + str(i), 'capacitor', hub, node, 10, 0, 'resonator_' + str(i))
+    records = builder.records()
+    # chain the ground terminals together as well as to GND
+    previous = None
+    for name, label, terminals, value, connections, subsystem in records:
+        t = terminals[1]
+        if connections[t] == ['GND']:
+            if previous is not None:
+                connections[t] = ['GND', previous]
+            previous = t
+    return records
+
+
+GENERATORS = {
+    'transmon_array': transmon_array,
+    'coupler_lattice': coupler_lattice,
+    'lc_chain': lc_chain,
+    'parallel_bank': parallel_bank,
+    'grounded_nets': grounded_nets,
+}
+
+
+def build_circuit(records):
+    # copy values and connection lists, conversion edits them in place
+    return Circuit([CircuitComponent(name, label, terminals, dict(value),
+        {t: list(cons) for t, cons in connections.items()}, subsystem)
+        for name, label, terminals, value, connections, subsystem in records])
+
+
+# stage name -> (setup(records) -> state, run(state)), only run is timed
+def get_stages():
+    def converted(records):
+        circuit = build_circuit(records)
+        return circuit, circuit.get_nodes()
+    return {
+        'build': (lambda records: records, build_circuit),
+        'get_nets': (build_circuit, lambda circuit: circuit.get_nets()),
+        'convert_parallel': (build_circuit, lambda circuit: circuit.convert_parallel()),
+        'get_nodes': (build_circuit, lambda circuit: circuit.get_nodes()),
+        'get_capacitance_graph': (converted,
+            lambda state: state[0].get_capacitance_graph(state[1])),
+        'get_inductor_list': (converted,
+            lambda state: state[0].get_inductor_list(state[1])),
+        'get_junction_list': (converted,
+            lambda state: state[0].get_junction_list(state[1])),
+        'get_subsystem_map': (converted, lambda state: state[0].get_subsystem_map(
+            state[0].get_component_name_subsystem(), state[1])),
+        'get_conversion_result': (build_circuit,
+            lambda circuit: circuit.get_conversion_result()),
+        'get_island_conversion_result': (build_circuit,
+            lambda circuit: circuit.get_island_conversion_result()),
+    }
+
+
+# best wall time over up to repeat runs (stops early past budget seconds),
+# and the peak traced memory of one more run if memory is set
+def measure(setup, run, records, repeat, budget, memory):
+    times = []
+    while len(times) < repeat and sum(times) < budget:
+        state = setup(records)
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        state = setup(records)
+        tracemalloc.start()
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(times), len(times), peak
+
+
+def get_revision():
+    try:
+        # the checkout benchmark.py lives in, wherever it is run from
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(generators, sizes, stages, repeat=3, budget=1.0, memory=True):
+    allStages = get_stages()
+    results = []
+    for generatorName in generators:
+        for size in sizes:
+            records = GENERATORS[generatorName](size)
+            for stage in stages:
+                setup, run = allStages[stage]
+                seconds, runs, peak = measure(setup, run, records, repeat, budget, memory)
+                result = {'generator': generatorName, 'size': size,
+                    'components': len(records), 'stage': stage,
+                    'seconds': seconds, 'runs': runs, 'peak_bytes': peak}
+                results.append(result)
+                print(format_result(result), flush=True)
+    return {'revision': get_revision(), 'python': platform.python_version(),
+        'numpy': np.__version__, 'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+
+def format_result(result, previous=None):
+    # stage names padded to the longest one, so the columns line up
+    stageWidth = max(len(stage) for stage in get_stages())
+    line = '{generator:16} {size:>7} {stage:{stageWidth}} {seconds:12.6f}s'.format(
+        stageWidth=stageWidth, **result)
+    if result['peak_bytes'] is not None:
+        line += ' {:10.1f} KiB'.format(result['peak_bytes'] / 1024)
+    if previous is not None:
+        line += '  x{:.2f} vs previous'.format(result['seconds'] / max(previous['seconds'], 1e-9))
+    return line
+
+
+# print the timing ratio of every result also present in previous
+def compare(report, previous):
+    before = {(r['generator'], r['size'], r['stage']): r for r in previous['results']}
+    print('\ncompared with revision', previous.get('revision'))
+    for result in report['results']:
+        old = before.get((result['generator'], result['size'], result['stage']))
+        if old is not None:
+            print(format_result(result, old))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time graph_conversion stages on synthetic circuits.')
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS),
+        default=list(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES),
+        help='approximate number of components')
+    parser.add_argument('--stages', nargs='+', choices=list(get_stages()),
+        default=list(get_stages()))
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs')
+    parser.add_argument('--budget', type=float, default=1.0,
+        help='stop repeating a stage once its runs took this many seconds')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory run')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.generators, args.sizes, args.stages,
+        args.repeat, args.budget, not args.no_memory)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,31 @@
 # Quantum SPICE 
 # Converts circuit information to capacitance & inductance graph
 
+from array import array
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import cached_property
+from types import MappingProxyType
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+import weakref
+from multiprocessing import Pool
+
+import numpy as np
+
 # arbitrary class for each components in the quantum circuit
 class CircuitComponent(object):
 
+    __slots__ = ('_name', '_label', '_terminals', '_value', '_connections', 
+        '_subsystem', '_circuit')
+
     def __init__(self, name, label, terminals, value, connections, subsystem=None):
         # name (string) -> e.g. C1, I2
         self._name = name
@@ -20,6 +42,15 @@ class CircuitComponent(object):
         # no connection is shown by []
         self._connections = connections
         self._subsystem = subsystem   
+        # circuit (weak reference to a Circuit) => circuit that indexes this 
+        # component, set by Circuit so renames/re-terminations keep its lookups valid
+        # (a component belongs to one live circuit at a time)
+        self._circuit = None
+
+    # circuit indexing this component, None if it isn't in a live circuit
+    def _get_circuit(self):
+        if self._circuit is not None:
+            return self._circuit()
     
     @property
     def name(self):
@@ -27,7 +58,12 @@ class CircuitComponent(object):
     
     @name.setter
     def name(self, new_name):
+        old_name = self._name
         self._name = new_name
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit._reindex_name(self, old_name)
+            circuit.mark_dirty(self, topology=False)
 
     @property
     def label(self):
@@ -36,6 +72,9 @@ class CircuitComponent(object):
     @label.setter
     def label(self, new_label):
         self._label = new_label
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit.mark_dirty(self)
 
     @property
     def terminals(self):
@@ -43,7 +82,12 @@ class CircuitComponent(object):
     
     @terminals.setter
     def terminals(self, new_terminals):
+        old_terminals = self._terminals
         self._terminals = new_terminals
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit._reindex_terminals(self, old_terminals)
+            circuit.mark_dirty(self)
 
     @property
     def value(self):
@@ -52,6 +96,9 @@ class CircuitComponent(object):
     @value.setter
     def value(self, new_value):
         self._value = new_value
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit.mark_dirty(self, topology=False)
     
     @property 
     def connections(self):
@@ -60,6 +107,9 @@ class CircuitComponent(object):
     @connections.setter 
     def connections(self, new_connections):
         self._connections = new_connections
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit.mark_dirty(self)
 
     @property 
     def subsystem(self):
@@ -68,44 +118,1103 @@ class CircuitComponent(object):
     @subsystem.setter 
     def subsystem(self, new_subsystem):
         self._subsystem = new_subsystem
-
-    def __del__(self):
-        self._name = None
-        self._label = None
-        self._terminals = None
-        self._value = None
-        self._connections = None
-        self._subsystem = None
-        del self 
+        circuit = self._get_circuit()
+        if circuit is not None:
+            circuit.mark_dirty(self, topology=False)
 
 class Subsystem(object):
 
-    subSystemMap = []
+    # live subsystems, held weakly so they go away with their last reference
+    subSystemMap = weakref.WeakSet()
 
-    def __init__(self, name, sys_label, options, nodes):
+    def __init__(self, name, sys_label, options, nodes, circuit=None):
         self._name = name
         self._sys_label = sys_label 
         self._options = options
         self._components = []
         self._nodes = nodes
-        # add circComp instance to circCompList
-        Subsystem.subSystemMap.append(self)  
+        Subsystem.subSystemMap.add(self)
+        # circuit (Circuit) => circuit whose registry holds this subsystem
+        if circuit is not None:
+            circuit.add_subsystem(self)
+
+    @property
+    def name(self):
+        return self._name
+
+# read-only copy of a component, held by CircuitSnapshot
+# (value and connections are read-only mappings)
+class FrozenComponent(object):
+
+    __slots__ = ('_name', '_label', '_terminals', '_value', '_connections', 
+        '_subsystem', '_circuit')
+
+    def __init__(self, name, label, terminals, value, connections, subsystem=None):
+        self._name = name
+        self._label = label
+        self._terminals = tuple(terminals)
+        self._value = MappingProxyType(dict(value))
+        self._connections = MappingProxyType({t: tuple(cons) for t, cons in connections.items()})
+        self._subsystem = subsystem
+        # set by the Circuit indexing the copy, only used by setters
+        self._circuit = None
+
+    @classmethod
+    def from_component(cls, comp):
+        return cls(comp.name, comp.label, comp.terminals, comp.value, 
+            comp.connections, comp.subsystem)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def label(self):
+        return self._label
+
+    @property
+    def terminals(self):
+        return self._terminals
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def connections(self):
+        return self._connections
+
+    @property
+    def subsystem(self):
+        return self._subsystem
+
+# read-only view of one component in a ComponentStore, 
+# same read API as CircuitComponent
+class ComponentView(object):
+
+    __slots__ = ('_store', '_index', '_circuit')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+        # circuit (weak reference to a Circuit) => circuit that indexes this view
+        self._circuit = None
+
+    # circuit indexing this view, None if it isn't in a live circuit
+    def _get_circuit(self):
+        if self._circuit is not None:
+            return self._circuit()
+
+    @property
+    def name(self):
+        return self._store._get_string(self._store._names, self._store._name_offsets, 
+            self._index)
+
+    @property
+    def label(self):
+        return self._store._label_table[self._store._labels[self._index]]
+
+    @property
+    def terminals(self):
+        store = self._store
+        if store._terminal_tuples is not None:
+            return store._terminal_tuples[self._index]
+        return tuple(map(store._get_terminal, 
+            store._terms[store._term_ptr[self._index]:store._term_ptr[self._index + 1]]))
+
+    @property
+    def value(self):
+        return self._value
+
+    # internal writes (convert_parallel) go to the circuit's overrides,
+    # the store itself is never written
+    @property
+    def _value(self):
+        circuit = self._get_circuit()
+        if circuit is not None and self._index in circuit._value_overrides:
+            return circuit._value_overrides[self._index]
+        return {'capacitance': self._store._capacitance[self._index], 
+            'inductance': self._store._inductance[self._index]}
+
+    @_value.setter
+    def _value(self, new_value):
+        circuit = self._get_circuit()
+        if circuit is None:
+            raise Exception("Component " + str(self.name) + " is read-only outside a circuit")
+        circuit._value_overrides[self._index] = new_value
+
+    @property
+    def connections(self):
+        return _StoreConnections(self._store, self._index, self._get_circuit())
+
+    @property
+    def subsystem(self):
+        return self._store._subsystem_table[self._store._subsystems[self._index]]
+
+# connections of one ComponentView, {terminal: [terminals]}
+class _StoreConnections(Mapping):
+
+    __slots__ = ('_store', '_index', '_circuit')
+
+    def __init__(self, store, index, circuit=None):
+        self._store = store
+        self._index = index
+        # circuit holding rewritten connection lists, if any
+        self._circuit = circuit
+
+    def _slot(self, terminal):
+        store = self._store
+        for slot in range(store._term_ptr[self._index], store._term_ptr[self._index + 1]):
+            if store._get_terminal(store._terms[slot]) == terminal:
+                return slot
+        raise KeyError(terminal)
+
+    def __getitem__(self, terminal):
+        store = self._store
+        slot = self._slot(terminal)
+        cons = store._cons[store._con_ptr[slot]:store._con_ptr[slot + 1]]
+        if self._circuit is not None:
+            if slot in self._circuit._connection_overrides:
+                return self._circuit._connection_overrides[slot]
+            # terminals merged away by the array-based convert_parallel
+            replacement = self._circuit._store_replacement
+            if any(con in replacement for con in cons):
+                newCons = _get_redirected_connections(store._terms[slot], cons, replacement)
+                return list(map(store._get_terminal, newCons))
+        return list(map(store._get_terminal, cons))
+
+    # rewritten connection lists are kept by the circuit, beside the CSR arrays
+    def __setitem__(self, terminal, new_connections):
+        if self._circuit is None:
+            raise Exception("Terminal " + str(terminal) + " is read-only outside a circuit")
+        self._circuit._connection_overrides[self._slot(terminal)] = list(new_connections)
+
+    def __iter__(self):
+        store = self._store
+        for slot in range(store._term_ptr[self._index], store._term_ptr[self._index + 1]):
+            yield store._get_terminal(store._terms[slot])
+
+    def __len__(self):
+        return self._store._term_ptr[self._index + 1] - self._store._term_ptr[self._index]
+
+# columnar storage for large circuits, 
+# component i is read through store[i] (a ComponentView) 
+# and Circuit(store) converts it on the arrays
+class ComponentStore(object):
+
+    def __init__(self, records):
+        """
+        Build the store from (name, label, terminals, value, connections, subsystem)
+        records, the CircuitComponent constructor arguments
+        """
+        # strings are utf-8 blobs + offsets, component i's name is 
+        # _names[_name_offsets[i]:_name_offsets[i + 1]]
+        self._names = bytearray()
+        self._name_offsets = array('q', [0])
+        self._terminal_names = bytearray()
+        self._terminal_offsets = array('q', [0])
+        # small tables, indexed by the per-component codes
+        self._label_table = []
+        self._labels = array('H')
+        self._subsystem_table = []
+        self._subsystems = array('i')
+        self._capacitance = array('d')
+        self._inductance = array('d')
+        # CSR: component i has terminal slots _term_ptr[i]:_term_ptr[i + 1],
+        # slot s holds terminal id _terms[s] and connects to 
+        # terminal ids _cons[_con_ptr[s]:_con_ptr[s + 1]]
+        self._term_ptr = array('q', [0])
+        self._terms = array('i')
+        self._con_ptr = array('q', [0])
+        self._cons = array('i')
+        self._views = None
+        # decoded terminal names and per-component terminal tuples, 
+        # see cache_strings
+        self._terminal_cache = None
+        self._terminal_tuples = None
+
+        # interning tables, only needed while building
+        terminalIds = {}
+        labelCodes = {}
+        subsystemCodes = {}
+        def terminal_id(terminal):
+            if terminal not in terminalIds:
+                terminalIds[terminal] = len(terminalIds)
+                self._terminal_names += terminal.encode()
+                self._terminal_offsets.append(len(self._terminal_names))
+            return terminalIds[terminal]
+
+        for name, label, terminals, value, connections, subsystem in records:
+            self._names += name.encode()
+            self._name_offsets.append(len(self._names))
+            if label not in labelCodes:
+                labelCodes[label] = len(self._label_table)
+                self._label_table.append(label)
+            self._labels.append(labelCodes[label])
+            if subsystem not in subsystemCodes:
+                subsystemCodes[subsystem] = len(self._subsystem_table)
+                self._subsystem_table.append(subsystem)
+            self._subsystems.append(subsystemCodes[subsystem])
+            self._capacitance.append(value['capacitance'])
+            self._inductance.append(value['inductance'])
+            for t in terminals:
+                self._terms.append(terminal_id(t))
+                self._cons.extend(terminal_id(con) for con in connections[t])
+                self._con_ptr.append(len(self._cons))
+            self._term_ptr.append(len(self._terms))
+
+    # build a store from objects with the CircuitComponent read API
+    @classmethod
+    def from_components(cls, components):
+        return cls((comp.name, comp.label, comp.terminals, comp.value, 
+            comp.connections, comp.subsystem) for comp in components)
+
+    def __len__(self):
+        return len(self._labels)
+
+    # pickle only the arrays, views and decoded names are rebuilt on use
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = None
+        state['_terminal_cache'] = None
+        state['_terminal_tuples'] = None
+        return state
+
+    def __getitem__(self, index):
+        return self.components()[index]
+
+    def __iter__(self):
+        return iter(self.components())
+
+    # one ComponentView per component, created on first use
+    def components(self):
+        if self._views is None:
+            self._views = [ComponentView(self, i) for i in range(len(self))]
+        return self._views
+
+    # zero-copy numpy views of the value columns
+    @property
+    def capacitance(self):
+        return np.frombuffer(self._capacitance, dtype=np.float64)
+
+    @property
+    def inductance(self):
+        return np.frombuffer(self._inductance, dtype=np.float64)
+
+    # decode every terminal name once, so loops over the views don't decode
+    # on each access (Circuit(store) works on the arrays and doesn't need it)
+    def cache_strings(self):
+        if self._terminal_cache is None:
+            self._terminal_cache = [self._get_string(self._terminal_names, 
+                self._terminal_offsets, i) for i in range(len(self._terminal_offsets) - 1)]
+            slotNames = [self._terminal_cache[t] for t in self._terms]
+            self._terminal_tuples = [tuple(slotNames[start:end]) 
+                for start, end in zip(self._term_ptr, self._term_ptr[1:])]
+
+    # release the decoded names to go back to the compact footprint
+    def drop_string_cache(self):
+        self._terminal_cache = None
+        self._terminal_tuples = None
+
+    # zero-copy numpy views of the CSR arrays: (term_ptr, terms, con_ptr, cons)
+    def _get_csr(self):
+        return (np.frombuffer(self._term_ptr, dtype=np.int64), 
+            np.frombuffer(self._terms, dtype=np.int32), 
+            np.frombuffer(self._con_ptr, dtype=np.int64), 
+            np.frombuffer(self._cons, dtype=np.int32))
+
+    # net of every terminal id, as the smallest terminal id on the net,
+    # connected through the connections of the given rows, with connected 
+    # terminal ids replaced as in replacement (terminals merged away),
+    # return (terminal slots of the rows, connected terminal ids, labels)
+    def _get_net_labels(self, rows, replacement=None):
+        termPtr, terms, conPtr, cons = self._get_csr()
+        slots = _ranges(termPtr[rows], termPtr[rows + 1])
+        conStarts = conPtr[slots]
+        conEnds = conPtr[slots + 1]
+        src = np.repeat(terms[slots], conEnds - conStarts)
+        dst = cons[_ranges(conStarts, conEnds)]
+        dst = self._replace_terminals(dst, replacement)
+        return slots, dst, _connected_labels(len(self._terminal_offsets) - 1, src, dst)
+
+    # terminal ids with those in replacement replaced
+    def _replace_terminals(self, ids, replacement):
+        if not replacement:
+            return ids
+        remap = np.arange(len(self._terminal_offsets) - 1, dtype=np.int32)
+        remap[np.fromiter(replacement.keys(), dtype=np.int64, count=len(replacement))] = \
+            np.fromiter(replacement.values(), dtype=np.int64, count=len(replacement))
+        return remap[ids]
+
+    # nets (a DisjointSet) of the given rows, computed on the CSR arrays
+    def _get_nets(self, rows, replacement=None):
+        slots, dst, labels = self._get_net_labels(rows, replacement)
+        used = np.unique(np.concatenate((np.frombuffer(self._terms, dtype=np.int32)[slots], dst)))
+        names = {i: self._get_terminal(i) for i in np.unique(labels[used]).tolist()}
+        nets = DisjointSet.from_parents({self._get_terminal(i): names[root] 
+            for i, root in zip(used.tolist(), labels[used].tolist())})
+        nets.add('GND')
+        return nets
+
+    # id of terminal name, -1 if no component has or connects to it
+    def _find_terminal(self, name):
+        data = np.frombuffer(name.encode(), dtype=np.uint8)
+        offsets = np.frombuffer(self._terminal_offsets, dtype=np.int64)
+        blob = np.frombuffer(self._terminal_names, dtype=np.uint8)
+        # compare the names of the same length byte by byte
+        candidates = np.flatnonzero(np.diff(offsets) == len(data))
+        found = (blob[offsets[candidates, None] + np.arange(len(data))] == data).all(axis=1)
+        matches = candidates[found]
+        return matches[0].item() if len(matches) else -1
+
+    # code of label in the label table, -1 if no component has it
+    def _get_label_code(self, label):
+        if label in self._label_table:
+            return self._label_table.index(label)
+        return -1
+
+    def _get_string(self, blob, offsets, index):
+        return blob[offsets[index]:offsets[index + 1]].decode()
+
+    def _get_terminal(self, terminalId):
+        if self._terminal_cache is not None:
+            return self._terminal_cache[terminalId]
+        return self._get_string(self._terminal_names, self._terminal_offsets, terminalId)
+
+# all outputs of converting one circuit
+class ConversionResult(object):
+
+    def __init__(self, node_tups, capacitance_graph, inductor_list, 
+        junction_list, subsystem_map):
+        # {(node1, node2): (value, component name)}
+        self.node_tups = node_tups
+        # {node1: {node2: capacitance}}
+        self.capacitance_graph = capacitance_graph
+        # [{(node1, node2): inductance}], one dict per subsystem
+        self.inductor_list = inductor_list
+        # [{(node1, node2): junction name}], one dict per subsystem
+        self.junction_list = junction_list
+        # {subsystem: [nodes]}
+        self.subsystem_map = subsystem_map
+
+    # compact picklable form: node names, edge and value arrays as bytes, 
+    # and the edge indices of each inductor/junction dict
+    # (the other outputs are rebuilt from the edges by unpack)
+    def pack(self):
+        nodeIndex = {}
+        for tup in self.node_tups:
+            for node in tup:
+                nodeIndex.setdefault(node, len(nodeIndex))
+        edgeIndex = {tup: i for i, tup in enumerate(self.node_tups)}
+        edges = np.array([[nodeIndex[node1], nodeIndex[node2]] 
+            for node1, node2 in self.node_tups], dtype=np.int32)
+        values = np.array([[val['capacitance'], val['inductance']] 
+            for val, name in self.node_tups.values()], dtype=np.float64)
+        names = [name for val, name in self.node_tups.values()]
+        inductorGroups = [np.array([edgeIndex[tup] for tup in ind], dtype=np.int32).tobytes() 
+            for ind in self.inductor_list]
+        junctionGroups = [np.array([edgeIndex[tup] for tup in junc], dtype=np.int32).tobytes() 
+            for junc in self.junction_list]
+        return (list(nodeIndex), edges.tobytes(), values.tobytes(), names, 
+            inductorGroups, junctionGroups, self.subsystem_map)
+
+    # inverse of pack, values come back as floats
+    @classmethod
+    def unpack(cls, packed):
+        nodes, edges, values, names, inductorGroups, junctionGroups, subsystemMap = packed
+        edges = np.frombuffer(edges, dtype=np.int32).reshape(-1, 2).tolist()
+        values = np.frombuffer(values, dtype=np.float64).reshape(-1, 2).tolist()
+        tups = [(nodes[node1], nodes[node2]) for node1, node2 in edges]
+        nodeTups = {}
+        capGraph = {}
+        for tup, (cap, ind), name in zip(tups, values, names):
+            nodeTups[tup] = ({'capacitance': cap, 'inductance': ind}, name)
+            if cap > 0:
+                capGraph.setdefault(tup[0], {})[tup[1]] = cap
+        inductorList = [{tups[i]: values[i][1] for i in np.frombuffer(group, dtype=np.int32).tolist()} 
+            for group in inductorGroups]
+        junctionList = [{tups[i]: names[i] for i in np.frombuffer(group, dtype=np.int32).tolist()} 
+            for group in junctionGroups]
+        return cls(nodeTups, capGraph, inductorList, junctionList, subsystemMap)
+
+# a ConversionResult stored in the binary format below, opened by memory mapping:
+# the arrays are zero-copy views of the file and every other output is built 
+# on first access, so only the parts that are read are loaded
+#
+# layout (little-endian): MAGIC, uint32 VERSION, uint32 section count,
+# then per section name (32 bytes), numpy dtype (8 bytes), uint64 offset, 
+# uint64 rows, uint64 columns (0 for 1-d), sections start on ALIGN bytes
+#   edges (int32, n_edges x 2)     node indices, in nodeTups order
+#   capacitance, inductance        float64 per edge
+#   component (int32)              component index per edge
+#   node_*, component_*, subsystem_* string tables: *_offsets (int64, n + 1)
+#                                  into *_bytes (utf-8), subsystem_none (uint8)
+#                                  marks the None subsystem
+#   inductor_*, junction_*         per dict: *_offsets (int64, n + 1) into 
+#                                  *_edges (int32 edge indices)
+#   subsystem_map_*                per subsystem: offsets into entries (int32),
+#                                  node index or -1 - component index
+class ConversionFile(object):
+
+    MAGIC = b'GCONVBIN'
+    VERSION = 1
+    ALIGN = 64
+    HEADER = struct.Struct('<8sII')
+    SECTION = struct.Struct('<32s8sQQQ')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < self.HEADER.size:
+            raise Exception(path + ' is not a conversion file')
+        magic, version, count = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise Exception(path + ' is not a conversion file')
+        if version != self.VERSION:
+            raise Exception(path + ' has conversion file version ' + str(version) 
+                + ', expected ' + str(self.VERSION))
+        # section name -> (dtype, offset, shape)
+        self._sections = {}
+        for i in range(count):
+            name, dtype, offset, rows, cols = self.SECTION.unpack_from(self._mmap, 
+                self.HEADER.size + i * self.SECTION.size)
+            self._sections[name.rstrip(b'\0').decode()] = (
+                np.dtype(dtype.rstrip(b'\0').decode()), offset, (rows, cols) if cols else (rows,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # the views handed out must be dropped before closing
+    def close(self):
+        # drop the cached outputs, some are views of the map
+        for name in [name for name in self.__dict__ 
+            if name not in ('path', '_mmap', '_sections')]:
+            del self.__dict__[name]
+        self._mmap.close()
+
+    # zero-copy read-only view of a section
+    def get_array(self, name):
+        dtype, offset, shape = self._sections[name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=int(np.prod(shape)), 
+            offset=offset).reshape(shape)
+
+    @cached_property
+    def edges(self):
+        return self.get_array('edges')
+
+    @cached_property
+    def capacitance(self):
+        return self.get_array('capacitance')
+
+    @cached_property
+    def inductance(self):
+        return self.get_array('inductance')
+
+    @cached_property
+    def component(self):
+        return self.get_array('component')
+
+    @cached_property
+    def node_names(self):
+        return self._get_strings('node')
+
+    @cached_property
+    def component_names(self):
+        return self._get_strings('component')
+
+    @cached_property
+    def subsystem_names(self):
+        names = self._get_strings('subsystem')
+        for i in np.flatnonzero(self.get_array('subsystem_none')).tolist():
+            names[i] = None
+        return names
+
+    # {(node1, node2): (value, component name)}, values are floats
+    @cached_property
+    def node_tups(self):
+        nodes = self.node_names
+        names = self.component_names
+        nodeTups = {}
+        for (node1, node2), cap, ind, comp in zip(self.edges.tolist(), 
+            self.capacitance.tolist(), self.inductance.tolist(), self.component.tolist()):
+            nodeTups[(nodes[node1], nodes[node2])] = (
+                {'capacitance': cap, 'inductance': ind}, names[comp])
+        return nodeTups
+
+    @cached_property
+    def capacitance_graph(self):
+        nodes = self.node_names
+        capGraph = {}
+        for i in np.flatnonzero(self.capacitance > 0).tolist():
+            node1, node2 = self.edges[i].tolist()
+            capGraph.setdefault(nodes[node1], {})[nodes[node2]] = float(self.capacitance[i])
+        return capGraph
+
+    @cached_property
+    def inductor_list(self):
+        return [{self._get_tup(i): float(self.inductance[i]) for i in group} 
+            for group in self._get_groups('inductor')]
+
+    @cached_property
+    def junction_list(self):
+        names = self.component_names
+        return [{self._get_tup(i): names[self.component[i]] for i in group} 
+            for group in self._get_groups('junction')]
+
+    @cached_property
+    def subsystem_map(self):
+        nodes = self.node_names
+        names = self.component_names
+        return {subsystem: [nodes[i] if i >= 0 else names[-1 - i] for i in group] 
+            for subsystem, group in zip(self.subsystem_names, self._get_groups('subsystem_map'))}
+
+    def get_conversion_result(self):
+        return ConversionResult(self.node_tups, self.capacitance_graph, 
+            self.inductor_list, self.junction_list, self.subsystem_map)
+
+    def _get_tup(self, edge):
+        node1, node2 = self.edges[edge].tolist()
+        return (self.node_names[node1], self.node_names[node2])
+
+    def _get_strings(self, name):
+        offsets = self.get_array(name + '_offsets').tolist()
+        data = self.get_array(name + '_bytes').tobytes()
+        return [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+    def _get_groups(self, name):
+        offsets = self.get_array(name + '_offsets').tolist()
+        entries = self.get_array(name + '_entries' if name == 'subsystem_map' 
+            else name + '_edges').tolist()
+        return [entries[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    # write result to path in this format (atomically, through a temporary file)
+    @classmethod
+    def write(cls, path, result):
+        nodeIndex = {}
+        for tup in result.node_tups:
+            for node in tup:
+                nodeIndex.setdefault(node, len(nodeIndex))
+        compIndex = {}
+        for val, name in result.node_tups.values():
+            compIndex.setdefault(name, len(compIndex))
+        edgeIndex = {tup: i for i, tup in enumerate(result.node_tups)}
+        mapEntries = []
+        for entries in result.subsystem_map.values():
+            # components without an edge appear by name
+            mapEntries.append([nodeIndex[entry] if entry in nodeIndex 
+                else -1 - compIndex.setdefault(entry, len(compIndex)) for entry in entries])
+
+        sections = [
+            ('edges', np.array([[nodeIndex[node1], nodeIndex[node2]] 
+                for node1, node2 in result.node_tups], dtype=np.int32).reshape(-1, 2)),
+            ('capacitance', np.array([val['capacitance'] 
+                for val, name in result.node_tups.values()], dtype=np.float64)),
+            ('inductance', np.array([val['inductance'] 
+                for val, name in result.node_tups.values()], dtype=np.float64)),
+            ('component', np.array([compIndex[name] 
+                for val, name in result.node_tups.values()], dtype=np.int32)),
+        ]
+        sections += _string_table('node', list(nodeIndex))
+        sections += _string_table('component', list(compIndex))
+        subsystems = list(result.subsystem_map)
+        sections += _string_table('subsystem', 
+            ['' if subsystem is None else subsystem for subsystem in subsystems])
+        sections.append(('subsystem_none', np.array([subsystem is None 
+            for subsystem in subsystems], dtype=np.uint8)))
+        sections += _group_table('inductor_offsets', 'inductor_edges', 
+            [[edgeIndex[tup] for tup in ind] for ind in result.inductor_list])
+        sections += _group_table('junction_offsets', 'junction_edges', 
+            [[edgeIndex[tup] for tup in junc] for junc in result.junction_list])
+        sections += _group_table('subsystem_map_offsets', 'subsystem_map_entries', mapEntries)
+
+        # section table, then the aligned data
+        offset = cls.HEADER.size + len(sections) * cls.SECTION.size
+        header = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(sections))]
+        layout = []
+        for name, data in sections:
+            data = np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<'))
+            offset = -(-offset // cls.ALIGN) * cls.ALIGN
+            header.append(cls.SECTION.pack(name.encode(), data.dtype.str.encode(), offset, 
+                data.shape[0], data.shape[1] if data.ndim == 2 else 0))
+            layout.append((offset, data))
+            offset += data.nbytes
+        tmpPath = path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            f.write(b''.join(header))
+            for start, data in layout:
+                f.write(b'\0' * (start - f.tell()))
+                f.write(data.tobytes())
+        os.replace(tmpPath, path)
+
+# sink for Circuit.iter_edges writing capacitance and inductance edges 
+# as JSON lines while they stream in, to any text stream (a file, 
+# socket.makefile('w'), ...), inductance edges go to inductance_stream if given, e.g.
+#   with open('caps.jsonl', 'w') as caps, open('inds.jsonl', 'w') as inds:
+#       EdgeWriter(caps, inds).write_all(circuit.iter_edges())
+# lines: {"nodes": ["n1", "GND"], "capacitance": 7, "component": "J1"}
+class EdgeWriter(object):
+
+    def __init__(self, capacitance_stream, inductance_stream=None, flush_every=1000):
+        self.capacitance_stream = capacitance_stream
+        self.inductance_stream = inductance_stream or capacitance_stream
+        # flush the streams after this many edges
+        self.flush_every = flush_every
+        self.capacitance_edges = 0
+        self.inductance_edges = 0
+        self._unflushed = 0
+
+    def write(self, node1, node2, value, component):
+        if value['capacitance'] > 0:
+            self.capacitance_stream.write(json.dumps({'nodes': [node1, node2], 
+                'capacitance': value['capacitance'], 'component': component}) + '\n')
+            self.capacitance_edges += 1
+        if value['inductance'] > 0:
+            self.inductance_stream.write(json.dumps({'nodes': [node1, node2], 
+                'inductance': value['inductance'], 'component': component}) + '\n')
+            self.inductance_edges += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    # write every edge, return the number of edges
+    def write_all(self, edges):
+        count = 0
+        for edge in edges:
+            self.write(*edge)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self):
+        self.capacitance_stream.flush()
+        if self.inductance_stream is not self.capacitance_stream:
+            self.inductance_stream.flush()
+        self._unflushed = 0
+
+# bookkeeping a Circuit keeps between incremental conversions
+class _IncrementalState(object):
+
+    def __init__(self):
+        # terminal -> node name, node name -> set of terminals
+        self.terminal_node = {}
+        self.node_terminals = {}
+        # node name -> node number, orders the nodes of an edge
+        self.node_number = {'GND': float('inf')}
+        self.next_node = 1
+        # component -> position in the component list
+        self.position = {}
+        # component -> terminals / subsystem at the last conversion
+        self.comp_terminals = {}
+        self.comp_subsystem = {}
+        # component -> frozenset of its two nodes (None if it has no edge)
+        self.comp_pair = {}
+        # frozenset of two nodes -> components across them
+        self.pair_comps = {}
+        # edge tuple <-> component that owns the nodeTups entry
+        self.edge_owner = {}
+        self.comp_edge = {}
+        # edge tuple -> subsystem of its owner
+        self.edge_subsystem = {}
+        # subsystem -> {component: None}, in component order
+        self.subsystem_comps = {}
+        # outputs, updated in place
+        self.node_tups = {}
+        self.capacitance_graph = {}
+        self.inductors = {}
+        self.junctions = {}
+        self.subsystem_map = {}
+
+# disjoint-set (union-find) over terminal names, 
+# used to merge connected terminals into electrical nodes
+class DisjointSet(object):
+
+    def __init__(self):
+        self._parent = {}
+        self._rank = {}
+
+    def __contains__(self, item):
+        return item in self._parent
+
+    def __iter__(self):
+        return iter(self._parent)
+
+    # build from an item -> representative mapping 
+    # (each representative maps to itself)
+    @classmethod
+    def from_parents(cls, parent):
+        disjointSet = cls()
+        disjointSet._parent = parent
+        disjointSet._rank = dict.fromkeys(parent, 0)
+        return disjointSet
+
+    def add(self, item):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._rank[item] = 0
+
+    # return the representative of item's set
+    def find(self, item):
+        parent = self._parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        # path compression
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    # merge the sets of a and b, return the new representative
+    def union(self, a, b):
+        rootA = self.find(a)
+        rootB = self.find(b)
+        if rootA == rootB:
+            return rootA
+        # union by rank
+        if self._rank[rootA] < self._rank[rootB]:
+            rootA, rootB = rootB, rootA
+        self._parent[rootB] = rootA
+        if self._rank[rootA] == self._rank[rootB]:
+            self._rank[rootA] += 1
+        return rootA
+
+# connectivity problems found by Circuit.validate_connectivity, 
+# each list holds one entry per problem
+class ValidationReport(object):
+
+    PROBLEMS = ('duplicate_names', 'no_terminals', 'too_many_terminals', 
+        'duplicate_terminals', 'missing_connections', 'unknown_terminals', 
+        'asymmetric_connections')
+
+    def __init__(self):
+        # [(name, [component indices])]
+        self.duplicate_names = []
+        # [name] of components without terminals
+        self.no_terminals = []
+        # [(name, number of terminals)] of components with more than two
+        self.too_many_terminals = []
+        # [(terminal, [names of the components listing it])]
+        self.duplicate_terminals = []
+        # [(name, terminal)] of terminals without a connections entry
+        self.missing_connections = []
+        # [(name, terminal, connection)] of connections to no component's terminal
+        self.unknown_terminals = []
+        # [(name, terminal, connection)] where connection doesn't list terminal back
+        self.asymmetric_connections = []
+
+    @property
+    def ok(self):
+        return not any(getattr(self, problem) for problem in self.PROBLEMS)
+
+    def __bool__(self):
+        return self.ok
+
+    # {problem: entries} of the problems found
+    def as_dict(self):
+        return {problem: getattr(self, problem) for problem in self.PROBLEMS 
+            if getattr(self, problem)}
+
+    def __str__(self):
+        if self.ok:
+            return 'no connectivity problems'
+        return '; '.join(problem + ': ' + ', '.join(str(entry) for entry in entries) 
+            for problem, entries in self.as_dict().items())
+
+    def raise_for_problems(self):
+        if not self.ok:
+            raise Exception('Invalid circuit, ' + str(self))
+
+# timings and counters collected by Circuit.profile
+class ConversionProfile(object):
+
+    # Circuit method -> stage it is timed as 
+    # (a stage's time includes the stages it calls)
+    STAGES = {
+        'get_nets': 'get_nets',
+        'convert_parallel': 'convert_parallel',
+        '_get_parallel_groups': 'find_parallel_groups',
+        '_merge_parallel': 'merge_parallel',
+        'get_nodes': 'get_nodes',
+        '_extract_nodes': 'extract_nodes',
+        '_get_edge_owners': 'number_nodes',
+        'get_component_name_subsystem': 'get_component_name_subsystem',
+        '_partition_by_subsystem': 'partition_by_subsystem',
+        'get_capacitance_graph': 'get_capacitance_graph',
+        'get_inductor_list': 'get_inductor_list',
+        '_get_inductor_list': 'build_inductor_list',
+        'get_junction_list': 'get_junction_list',
+        '_get_junction_list': 'build_junction_list',
+        'get_subsystem_map': 'get_subsystem_map',
+        'get_node_matrices': 'get_node_matrices',
+        'get_reduced_graph': 'get_reduced_graph',
+        'get_conversion_result': 'get_conversion_result',
+        'update_conversion_result': 'update_conversion_result',
+    }
+    # lookup helpers whose calls are counted
+    COUNTED = ('get_component_from_terminal', 'check_terminal_in_dict', 
+        'get_component_from_name', 'get_other_terminal_same_component', 
+        'get_value_from_terminal')
+
+    def __init__(self, callback=None):
+        # callback(stage, seconds) is called as each stage finishes
+        self.callback = callback
+        # stage -> total wall time in seconds / number of calls
+        self.stage_time = {}
+        self.stage_calls = {}
+        # lookup helper -> number of calls
+        self.call_counts = dict.fromkeys(self.COUNTED, 0)
+        # parallel_groups / merged_components summed over the conversions,
+        # nodes / edges of the last node extraction
+        self.counts = {'parallel_groups': 0, 'merged_components': 0, 'nodes': 0, 'edges': 0}
+
+    # flat {metric name: number} for metrics exporters
+    def as_dict(self, prefix='graph_conversion'):
+        metrics = {}
+        for stage in self.stage_time:
+            metrics[prefix + '.stage.' + stage + '.seconds'] = self.stage_time[stage]
+            metrics[prefix + '.stage.' + stage + '.calls'] = self.stage_calls[stage]
+        for name, calls in self.call_counts.items():
+            metrics[prefix + '.calls.' + name] = calls
+        for name, count in self.counts.items():
+            metrics[prefix + '.' + name] = count
+        return metrics
+
+    def _add_time(self, stage, seconds):
+        self.stage_time[stage] = self.stage_time.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    # record what a stage returned
+    def _add_result(self, method, result):
+        if method == '_get_parallel_groups':
+            self.counts['parallel_groups'] += len(result)
+        elif method == '_merge_parallel':
+            self.counts['merged_components'] += len(result)
+        elif method == '_extract_nodes':
+            nodeTups, nets, nodeNames = result
+            self.counts['nodes'] = len(nodeNames)
+            self.counts['edges'] = len(nodeTups)
+
+    def _timed(self, method, function):
+        stage = self.STAGES[method]
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self._add_time(stage, time.perf_counter() - start)
+            self._add_result(method, result)
+            return result
+        return timed
+
+    def _counted(self, method, function):
+        def counted(*args, **kwargs):
+            self.call_counts[method] += 1
+            return function(*args, **kwargs)
+        return counted
 
 class Circuit(object):
+
+    # edges iter_edges converts from arrays at a time
+    STREAM_CHUNK = 4096
+
     def __init__(self, circuit_component_list):
         """
         Create a circuit object to manage circuit-level operations using a circuit component list and
         circuit-level methods
         """
-        self._circuit_component_list = circuit_component_list
+        # components refer back to the circuit through this weak reference
+        self._ref = weakref.ref(self)
+        # terminal -> component and name -> component lookups,
+        # later components sharing a key wait in the duplicates
+        self._terminal_duplicates = {}
+        self._name_duplicates = {}
+        # a store is converted on its arrays: _store_rows are the rows 
+        # still in the circuit, the views and indexes are only created 
+        # when something needs them (the store itself is never written)
+        self._store = None
+        self._store_rows = None
+        # store row -> merged value, terminal slot -> rewritten connection list
+        self._value_overrides = {}
+        self._connection_overrides = {}
+        # terminal id -> id of the terminal it was merged into
+        self._store_replacement = {}
+        if isinstance(circuit_component_list, ComponentStore):
+            self._store = circuit_component_list
+            self._store_rows = np.arange(len(self._store))
+        else:
+            self._circuit_component_list = circuit_component_list
+            self._terminal_index = {}
+            self._name_index = {}
+            for comp in self._circuit_component_list:
+                self._add_to_index(comp)
+        # components edited since the last incremental conversion,
+        # comp -> True if its topology changed
+        self._dirty = {}
+        self._state = None
+        # subsystem name -> Subsystem registered with this circuit
+        self._subsystems = {}
+
+    # with Circuit(comps) as circuit: ... releases everything on exit
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.clear_circuit_component_list()
 
     def clear_circuit_component_list(self):
         """
-        Clear the circuit component list
+        Clear the circuit component list and subsystem registry
         """
-        for comp in self._circuit_component_list:
-            CircuitComponent.__del__(comp)
+        # detached components can join another circuit
+        # (a store's views may never have been created)
+        if self._store_rows is None:
+            for comp in self._circuit_component_list:
+                if comp._circuit is self._ref:
+                    comp._circuit = None
         self._circuit_component_list = []
+        self._terminal_index = {}
+        self._name_index = {}
+        self._terminal_duplicates = {}
+        self._name_duplicates = {}
+        # the store's arrays are released with it
+        self._store = None
+        self._store_rows = None
+        self._value_overrides = {}
+        self._connection_overrides = {}
+        self._store_replacement = {}
+        self._dirty = {}
+        self._state = None
+        self._subsystems = {}
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##             Subsystem Functions            ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # register subsystem with this circuit, names are unique per circuit
+    def add_subsystem(self, subsystem):
+        if subsystem.name in self._subsystems:
+            raise Exception("Subsystem " + str(subsystem.name) + " already exists")
+        self._subsystems[subsystem.name] = subsystem
+
+    def remove_subsystem(self, name):
+        if name not in self._subsystems:
+            raise Exception(str(name) + " subsystem doesn't exist")
+        return self._subsystems.pop(name)
+
+    def get_subsystem_from_name(self, name):
+        subsystem = self._subsystems.get(name)
+        if subsystem is not None:
+            return subsystem
+        raise Exception(str(name) + " subsystem doesn't exist")
+
+    # registered subsystems in registration order
+    def get_subsystems(self):
+        return list(self._subsystems.values())
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##               Index Functions              ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # a store's views, created on first use from the rows left after merging,
+    # the array-based functions are not used once they exist
+    @cached_property
+    def _circuit_component_list(self):
+        views = [ComponentView(self._store, i) for i in self._store_rows.tolist()]
+        for view in views:
+            view._circuit = self._ref
+        self._store_rows = None
+        return views
+
+    # a store's indexes, built on first use
+    @cached_property
+    def _terminal_index(self):
+        index = {}
+        for comp in self._circuit_component_list:
+            for t in comp.terminals:
+                self._index_key(index, self._terminal_duplicates, t, comp)
+        return index
+
+    @cached_property
+    def _name_index(self):
+        index = {}
+        for comp in self._circuit_component_list:
+            self._index_key(index, self._name_duplicates, comp.name, comp)
+        return index
+
+    # register comp's name and terminals, components are added in list order
+    # (read-only FrozenComponents may be shared between circuits, 
+    # anything else edited in one circuit would leave the other's indexes stale)
+    def _add_to_index(self, comp):
+        owner = comp._circuit
+        if (owner is not None and owner is not self._ref and owner() is not None 
+                and not isinstance(comp, FrozenComponent)):
+            raise Exception("Component " + str(comp.name) + " already belongs to another circuit")
+        comp._circuit = self._ref
+        self._index_key(self._name_index, self._name_duplicates, comp.name, comp)
+        for t in comp.terminals:
+            self._index_key(self._terminal_index, self._terminal_duplicates, t, comp)
+
+    # remove comps from the circuit and from both indexes
+    def _remove_components(self, comps):
+        for comp in comps:
+            self._unindex_key(self._name_index, self._name_duplicates, comp.name, comp)
+            for t in comp.terminals:
+                self._unindex_key(self._terminal_index, self._terminal_duplicates, t, comp)
+            comp._circuit = None
+        removed = set(map(id, comps))
+        self._circuit_component_list[:] = [comp for comp in self._circuit_component_list 
+            if id(comp) not in removed]
+
+    # called by the CircuitComponent setters
+    def _reindex_name(self, comp, old_name):
+        self._unindex_key(self._name_index, self._name_duplicates, old_name, comp)
+        self._index_key(self._name_index, self._name_duplicates, comp.name, comp, 
+            ordered=False)
+
+    def _reindex_terminals(self, comp, old_terminals):
+        for t in old_terminals:
+            self._unindex_key(self._terminal_index, self._terminal_duplicates, t, comp)
+        for t in comp.terminals:
+            self._index_key(self._terminal_index, self._terminal_duplicates, t, comp, 
+                ordered=False)
+
+    # index key -> comp, the first component in the list wins (same as a linear scan),
+    # ordered means comp comes after every component already indexed
+    def _index_key(self, index, duplicates, key, comp, ordered=True):
+        holder = index.setdefault(key, comp)
+        if holder is comp:
+            return
+        if not ordered and self._get_position(comp) < self._get_position(holder):
+            index[key] = comp
+            comp = holder
+        duplicates.setdefault(key, []).append(comp)
+
+    # remove key -> comp, the next component with the key takes its place
+    def _unindex_key(self, index, duplicates, key, comp):
+        others = duplicates.get(key)
+        if index.get(key) is comp:
+            if others:
+                first = min(others, key=self._get_position)
+                index[key] = first
+                others.remove(first)
+            else:
+                del index[key]
+        elif others:
+            for i, other in enumerate(others):
+                if other is comp:
+                    del others[i]
+                    break
+        if others == []:
+            del duplicates[key]
+
+    # position of comp in the component list (only needed for duplicate keys)
+    def _get_position(self, comp):
+        for i, other in enumerate(self._circuit_component_list):
+            if other is comp:
+                return i
 
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     ##              Helper Functions              ##
@@ -116,10 +1225,10 @@ class Circuit(object):
         """
         Return the CircuitComponent that has the give input terminal
         """
-        for component in self._circuit_component_list:
-            if terminal in component.terminals:
-                return component
-        raise Exception("Terminal " + terminal + " doesn't exist, perhaps you have a wrong test case?")
+        component = self._terminal_index.get(terminal)
+        if component is not None:
+            return component
+        raise Exception("Terminal " + str(terminal) + " doesn't exist, perhaps you have a wrong test case?")
 
 
     # return other terminal in the same component 
@@ -137,10 +1246,10 @@ class Circuit(object):
         return component.value
 
     def get_component_from_name(self, name):
-        for comp in self._circuit_component_list:
-            if comp.name == name:
-                return comp
-        raise Exception(comp + " comp doesn't exist")  
+        comp = self._name_index.get(name)
+        if comp is not None:
+            return comp
+        raise Exception(str(name) + " comp doesn't exist")  
 
     def get_set(self, term, cons):
         conSet = set()
@@ -168,157 +1277,147 @@ class Circuit(object):
     ##              Main Functions              ##
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
+    # merge every terminal with its connections, 
+    # all terminals connected to 'GND' end up in the 'GND' set
+    def get_nets(self):
+        # rewritten connection lists are only known as strings, 
+        # those go through the DisjointSet below
+        if self._store is not None and not self._connection_overrides:
+            return self._store._get_nets(self._get_store_rows(), self._store_replacement)
+        nets = DisjointSet()
+        nets.add('GND')
+        for comp in self._circuit_component_list:
+            for t in comp.terminals:
+                nets.add(t)
+                for con in comp.connections[t]:
+                    nets.add(con)
+                    nets.union(t, con)
+        return nets
+
+    # merge components connected in parallel (across the same two nodes)
+    # into a single component with the combined capacitance and inductance:
+    # everything in parallel with a junction is folded into the junction,
+    # otherwise into the first component of the branch
     def convert_parallel(self):
-        # make 2d list of comps connected in parallel
+        # merging invalidates the incremental bookkeeping
+        self._state = None
+        if self._store_rows is not None:
+            self._merge_store_rows()
+            return
+        nets = self.get_nets()
+        self._merge_parallel(self._circuit_component_list, nets.find)
+
+    # merge parallel components among comps, nodeOf maps a terminal to its node,
+    # return the removed components
+    def _merge_parallel(self, comps, nodeOf):
+        # keep the first comp of each group with the combined value
+        removed = []
+        # removed terminal -> kept terminal on the same node
+        replacement = {}
+        groups = list(self._get_parallel_groups(comps, nodeOf))
+        for con, value in zip(groups, _get_merged_values(groups)):
+            keep = con[0]
+            # not an edit, so bypass the setter
+            keep._value = value
+
+            keepTerms = {nodeOf(t): t for t in keep.terminals}
+            for comp in con[1:]:
+                removed.append(comp)
+                for t in comp.terminals:
+                    replacement[t] = keepTerms[nodeOf(t)]
+
+        if not removed:
+            return removed
+        self._remove_components(removed)
+        # rebuild connections once, pointing at the kept terminals
+        # (only comps on the merged nodes can refer to removed terminals)
+        for comp in comps:
+            if comp._circuit is not self._ref:
+                continue
+            for t in comp.terminals:
+                newCons = _get_redirected_connections(t, comp.connections[t], replacement)
+                if newCons is not None:
+                    comp.connections[t] = newCons
+        return removed
+
+    # return the groups of comps that merge into their first comp
+    def _get_parallel_groups(self, comps, nodeOf):
+        # node pair -> list of comps connected across it
+        branches = {}
+        for comp in comps:
+            if len(comp.terminals) != 2:
+                continue
+            node1 = nodeOf(comp.terminals[0])
+            node2 = nodeOf(comp.terminals[1])
+            if node1 != node2:
+                branches.setdefault(frozenset((node1, node2)), []).append(comp)
+
+        # each branch merges into one edge
         parallelConnections = []
-        existingComp = []
-        for comp in self._circuit_component_list:
-            if comp not in existingComp:
-                conInParallel = [comp]
-                connected1 = []
-                for term in comp.connections:
-                    for con in comp.connections[term]:
-                        # skip resonator and ground node 
-                        if con[0] != 'R' and con != 'GND':
-                            conComp = self.get_component_from_terminal(con)
-                            # if same label, add in the same list 
-                            if (comp.label == 'junction') or (conComp.label == comp.label) or (conComp.label == 'junction'):
-                                # if same comp connected to both terminals
-                                if conComp in connected1:
-                                    conInParallel.append(conComp)
-                                else:
-                                    connected1.append(conComp)     
-                if len(conInParallel) > 1:
-                    parallelConnections.append(conInParallel)
-                    for c in conInParallel:
-                        existingComp.append(c)
-        # loop through parallelConnections list,
-        # replace parallel-conneted comps with single comp
-        # don't remove junctions for now
-        for con in parallelConnections:
-            newCap = 0 
-            newInd = 0
-
-            # check if there's a junction
-            hasJunction = False 
-            junction = None
-            for comp in con: 
-                if (comp.label == 'junction'):
-                    hasJunction = True
-                    junction = comp
-
-            # if there's a junction, add capacitance and inductance
-            # of other parallel-connected components to the junction
-            if hasJunction: 
-                newCap = junction.value['capacitance']
-                newInd = junction.value['inductance']
-                for comp in con:
-                    if (comp.name != junction.name):
-                        # add capacitance and inductance in parallel
-                        if comp.label == 'junction':
-                            cap = comp.value['capacitance']
-                            indu = comp.value['inductance']
-                            newCap += cap
-                            newInd +=  1 / indu
-                        elif comp.label == 'capacitor':
-                            newCap += comp.value['capacitance']
-                        elif comp.label == 'inductor':
-                            newInd += 1 / comp.value['inductance']
-
-                        # remove redundant connections
-                        for t in comp.terminals:
-                            for origT in junction.terminals:
-                                if t in junction.connections[origT]:
-                                    junction.connections[origT].remove(t) 
-
-                        # remove terminals of comp in all other comps' connections
-                        for itComp in self._circuit_component_list: 
-                            for itT in itComp.terminals:
-                                for compT in comp.terminals:
-                                    if compT in itComp.connections[itT]:
-                                        itComp.connections[itT].remove(compT)
-
-                        # remove parallel-connected component
-                        self._circuit_component_list.remove(comp)    
-
-                # update capacitance and inductance of the junction  
-                junction.value = {'capacitance': newCap, 'inductance': newInd}
-            # if there're only capacitors
-            elif con[0].label == 'capacitor':       
-                for comp in con[1:]:
-                    # add capacitance in parallel
-                    newVal += comp.value['capacitance']
-                    # remove redundant connections
-                    for t in comp.terminals:
-                        for origT in con[0].terminals:
-                            if t in con[0].connections[origT]:
-                                con[0].connections[origT].remove(t) 
-                    # remove parallel-connected component
-                    self._circuit_component_list.remove(comp)      
-                con[0].value = str(newVal) + 'F'          
-            # if there're only inductors
-            elif con[0].label == 'inductor':
-                for comp in con[1:]:
-                    # inverse -- 
-                    newVal +=  1 / comp.value['inductance']
-                    # remove redundant connections
-                    for t in comp.terminals:
-                        for origT in con[0].terminals:
-                            if t in con[0].connections[origT]:
-                                con[0].connections[origT].remove(t)  
-                    # remove parallel-connected component
-                    self._circuit_component_list.remove(comp)
-                # rounding?    
-                con[0].value = str(1 / newVal) + 'H'          
+        for branch in branches.values():
+            if len(branch) < 2:
+                continue
+            junctions = [comp for comp in branch if comp.label == 'junction']
+            if junctions:
+                # junction first so it is kept
+                parallelConnections.append(junctions[:1] 
+                    + [comp for comp in branch if comp is not junctions[0]])
+            else:
+                parallelConnections.append(branch)
+        return parallelConnections
 
     # loop through each component, 
     # return the list of nodes and the values between them
     def get_nodes(self):
-        self.convert_parallel()
-        clist = []
-        for comp in self._circuit_component_list:
-            clist += [comp.name]
+        if self._store_rows is not None:
+            self.convert_parallel()
+            return self._get_store_nodes()[0]
+        return self._extract_nodes()[0]
 
-        nodeTups = {}
-        nodeDict = {}
+    # return nodeTups, the nets and {net representative: (node name, number)}
+    def _extract_nodes(self):
+        self.convert_parallel()
+        nets = self.get_nets()
+        edgeOwners, nodeNames = self._get_edge_owners(self._circuit_component_list, nets)
+        nodeTups = {tup: (comp.value, comp.name) for tup, comp in edgeOwners.items()}
+        return nodeTups, nets, nodeNames
+
+    # name the nodes of comps and pick the comp behind each edge,
+    # return {(node1, node2): comp} in nodeTups order 
+    # and {net representative: (node name, node number)}
+    def _get_edge_owners(self, comps, nets):
+        groundRoot = nets.find('GND')
+        edgeOwners = {}
+        nodeNames = {groundRoot: ('GND', float('inf'))}
         ind = 0
-        groundSet = set()
-        for comp in self._circuit_component_list:
-            # for each terminal,
-            nodeName = 'n' + str(ind)
+        for comp in comps:
+            nodes = []
+            # nodes are numbered in order of first appearance
             for t in comp.terminals:
-                connections = comp.connections[t]
-                
-                if 'GND' in connections: 
-                    groundSet.update(connections)
-                    groundSet.add(t)
-                    groundSet.discard('GND')
-                else: 
-                    fSet = self.get_set(t, connections)
-                    # check if node already exist
-                    if not (fSet in nodeDict):
-                        # add to nodeDict
-                        ind += 1
-                        nodeName = 'n' + str(ind)
-                        nodeDict[fSet] = nodeName
-                    
-                    # check if connected to other node
-                    otherT = self.get_other_terminal_same_component(t)
-                    node = self.check_terminal_in_dict(otherT, nodeDict)
-                    val = self.get_value_from_terminal(t)
-                    if ((node != None) and (node != nodeName) 
-                        and (not self.node_in_list(node, nodeName, nodeTups))):
-                        nodeTups[(node, nodeName)] = (val, comp.name)
-                    elif otherT in groundSet:
-                        nodeTups[(nodeName, 'GND')] = (val, comp.name)
-
-        return nodeTups
-
-    def get_component_name_subsystem(self):
+                root = nets.find(t)
+                if root not in nodeNames:
+                    ind += 1
+                    nodeNames[root] = ('n' + str(ind), ind)
+                nodes.append(nodeNames[root])
+            # (assume only two terminals in a single componenet)
+            if len(nodes) != 2 or nodes[0] == nodes[1]:
+                continue
+            # lower-numbered node first, GND always second
+            node1, node2 = sorted(nodes, key=lambda node: node[1])
+            tup = (node1[0], node2[0])
+            # parallel edges to GND overwrite, others keep the first one
+            if node2[0] == 'GND' or tup not in edgeOwners:
+                edgeOwners[tup] = comp
+        return edgeOwners, nodeNames
+
+    def get_component_name_subsystem(self, comps=None):
         # dictionary of subsystems
         # values are set of comps' names in particular subsystem
+        # (of comps if given, otherwise of the whole circuit)
+        if comps is None:
+            comps = self._circuit_component_list
         subDict = {}
-        for comp in self._circuit_component_list:
+        for comp in comps:
             subSys = comp.subsystem
             # if comp is in a subsystem
             if subSys != '':
@@ -328,61 +1427,76 @@ class Circuit(object):
                     subDict[subSys].append(comp.name)
         return subDict
 
+    # group nodeTups edges by the subsystem of their component in one pass,
+    # return {subsystem: [(tup, val, comp)]} keyed in subsystemDict order
+    # (names are looked up in comps if given, the first one wins)
+    def _partition_by_subsystem(self, nodeTups, subsystemDict, comps=None):
+        getComponent = self.get_component_from_name
+        if comps is not None:
+            nameIndex = {}
+            for comp in comps:
+                nameIndex.setdefault(comp.name, comp)
+            getComponent = nameIndex.__getitem__
+        edges = {subSys: [] for subSys in subsystemDict}
+        for tup in nodeTups:
+            val, name = nodeTups[tup]
+            comp = getComponent(name)
+            if comp.subsystem in edges:
+                edges[comp.subsystem].append((tup, val, comp))
+        return edges
+
     # convert componenets in subsystem map as nodes
     def get_subsystem_map(self, subsystemDict, nodeTup):
-        subsystemMap = subsystemDict.copy()
-        # loop through all subsystems
+        # component name -> nodes it's connected to
+        compNodes = {}
+        for tup in nodeTup:
+            compNodes.setdefault(nodeTup[tup][1], tup)
+        subsystemMap = {}
         for subsystem in subsystemDict:
-            # for each component in a subsystem
+            entries = []
+            seen = set()
             for comp in subsystemDict[subsystem]:
-                for tup in nodeTup:
-                    if nodeTup[tup][1] == comp:
-                        subsystemMap[subsystem].remove(comp)
-                        # convert component to nodes it's connected to
-                        if tup[0] not in subsystemMap[subsystem]:
-                            subsystemMap[subsystem].append(tup[0])
-                        if tup[1] not in subsystemMap[subsystem]:
-                            subsystemMap[subsystem].append(tup[1])
-                        break
+                # components without an edge are kept by name
+                for entry in compNodes.get(comp, (comp,)):
+                    if entry not in seen:
+                        seen.add(entry)
+                        entries.append(entry)
+            subsystemMap[subsystem] = entries
         return subsystemMap
 
     def get_inductor_list(self, nodeTups):
+        subSysEdges = self._partition_by_subsystem(nodeTups, 
+            self.get_component_name_subsystem())
+        return self._get_inductor_list(subSysEdges)
+
+    def _get_inductor_list(self, subSysEdges):
         ind_list = []
         # one dictionary per subsystem
-        ind_dict = dict()
-        subSysDict = self.get_component_name_subsystem()
-        # loop through each subsystem
-        for subSys in subSysDict:
-            for tup in nodeTups:         
-                val = nodeTups[tup][0]
-                comp = self.get_component_from_name(nodeTups[tup][1])
-                compSS = comp.subsystem
-                inductance = val['inductance']
-                # if has value of inductance and is in current subSys
-                if subSys == compSS and inductance > 0:
-                    ind_dict[tup] = inductance
+        for subSys in subSysEdges:
+            ind_dict = dict()
+            for tup, val, comp in subSysEdges[subSys]:
+                # if has value of inductance
+                if val['inductance'] > 0:
+                    ind_dict[tup] = val['inductance']
             if ind_dict != {}:
                 ind_list.append(ind_dict)
-            ind_dict = {}
         return ind_list
 
     def get_junction_list(self, nodeTups):
+        subSysEdges = self._partition_by_subsystem(nodeTups, 
+            self.get_component_name_subsystem())
+        return self._get_junction_list(subSysEdges)
+
+    def _get_junction_list(self, subSysEdges):
         junctionList = []
         # one dictionary per subsystem
-        junctionDict = dict()
-        # loop through each subsystem
-        subSysDict = self.get_component_name_subsystem()
-        for subSys in subSysDict:
-            for tup in nodeTups:         
-                comp = self.get_component_from_name(nodeTups[tup][1])
-                compSS = comp.subsystem
-                # if has value of inductance and is in current subSys
-                if comp.label == 'junction' and subSys == compSS:
+        for subSys in subSysEdges:
+            junctionDict = dict()
+            for tup, val, comp in subSysEdges[subSys]:
+                if comp.label == 'junction':
                     junctionDict[tup] = comp.name
             if junctionDict != {}:
                 junctionList.append(junctionDict)
-            junctionDict = {}
-
         return junctionList
 
     def get_capacitance_graph(self, nodeTups):
@@ -401,8 +1515,1954 @@ class Circuit(object):
 
         return capGraph
 
+    # return the node list and the Maxwell capacitance and 
+    # inverse-inductance (Laplacian) matrices of nodeTups,
+    # row/column i of both matrices is nodeList[i] and GND is eliminated 
+    # (edges to GND only add to the diagonal),
+    # matrices are scipy CSR if sparse is True, numpy arrays otherwise
+    def get_node_matrices(self, nodeTups, sparse=False):
+        # node name -> row, GND -> -1
+        nodeIndex = {'GND': -1}
+        nodeList = []
+        idx = np.empty((len(nodeTups), 2), dtype=np.intp)
+        caps = np.empty(len(nodeTups))
+        inds = np.empty(len(nodeTups))
+        for i, (tup, (val, name)) in enumerate(nodeTups.items()):
+            for k, node in enumerate(tup):
+                if node not in nodeIndex:
+                    nodeIndex[node] = len(nodeList)
+                    nodeList.append(node)
+                idx[i, k] = nodeIndex[node]
+            caps[i] = val['capacitance']
+            inds[i] = val['inductance']
+
+        # inductance 0 means no inductive path
+        invInds = np.zeros_like(inds)
+        np.divide(1, inds, out=invInds, where=inds > 0)
+
+        size = len(nodeList)
+        capMatrix = _scatter_laplacian(idx[:, 0], idx[:, 1], caps, size, sparse)
+        invIndMatrix = _scatter_laplacian(idx[:, 0], idx[:, 1], invInds, size, sparse)
+        return nodeList, capMatrix, invIndMatrix
+
+    # eliminate every node of nodeTups not in keep (GND is always kept) 
+    # by Kron reduction (Schur complement) of the capacitance and 
+    # inverse-inductance matrices, keep defaults to the junction nodes,
+    # return the reduced (capacitance graph, inductor list) in the shapes of
+    # get_capacitance_graph and get_inductor_list: a reduced inductor goes in
+    # the dictionary of the first subsystem whose map holds both of its nodes,
+    # the ones no subsystem holds in a last dictionary,
+    # entries at or below tol relative to the largest diagonal entry are dropped
+    def get_reduced_graph(self, nodeTups, keep=None, sparse=False, tol=1e-12):
+        if keep is None:
+            keep = [node for junctionDict in self.get_junction_list(nodeTups) 
+                for tup in junctionDict for node in tup]
+        keep = set(keep)
+        nodeList, capMatrix, invIndMatrix = self.get_node_matrices(nodeTups, sparse)
+        kept = np.array([i for i, node in enumerate(nodeList) if node in keep], dtype=np.intp)
+        eliminated = np.array([i for i, node in enumerate(nodeList) if node not in keep], 
+            dtype=np.intp)
+        keptNodes = [nodeList[i] for i in kept]
+
+        capGraph = dict()
+        for node1, node2, capacitance in _get_reduced_edges(
+            _kron_reduce(capMatrix, kept, eliminated, sparse), keptNodes, tol):
+            capGraph.setdefault(node1, dict())[node2] = capacitance
+
+        subsystemMap = self.get_subsystem_map(self.get_component_name_subsystem(), nodeTups)
+        nodeSets = [set(nodes) for nodes in subsystemMap.values()]
+        # one dictionary per subsystem, then one for the rest
+        indDicts = [dict() for nodes in nodeSets] + [dict()]
+        for node1, node2, invInductance in _get_reduced_edges(
+            _kron_reduce(invIndMatrix, kept, eliminated, sparse), keptNodes, tol):
+            k = len(nodeSets)
+            for i, nodes in enumerate(nodeSets):
+                if node1 in nodes and node2 in nodes:
+                    k = i
+                    break
+            indDicts[k][(node1, node2)] = 1 / invInductance
+        return capGraph, [indDict for indDict in indDicts if indDict != {}]
+
+    # return an immutable CircuitSnapshot of the current components,
+    # its outputs are computed on demand without modifying this circuit
+    def snapshot(self):
+        return CircuitSnapshot(self._circuit_component_list)
+
+    # split the components into islands, groups connected other than 
+    # through GND itself (GND is shared by all islands), 
+    # return a list of component lists, both in circuit order
+    def get_islands(self):
+        comps = self._circuit_component_list
+        order, starts = self._get_island_order(self._get_csr())
+        return [[comps[i] for i in island] for island in np.split(order, starts[1:]) if len(island)]
+
+    # the components as CSR arrays in circuit order (as ComponentStore._get_csr) 
+    # with the number of terminal ids and the id of GND (-1 if nothing has it):
+    # (term_ptr, terms, con_ptr, cons, size, ground), a store's rows are cut 
+    # out of its arrays, other components are encoded in one pass
+    def _get_csr(self):
+        if self._store_rows is not None and not self._connection_overrides:
+            store = self._store
+            rows = self._store_rows
+            termPtr, terms, conPtr, cons = store._get_csr()
+            slots = _ranges(termPtr[rows], termPtr[rows + 1])
+            conCounts = conPtr[slots + 1] - conPtr[slots]
+            cons = store._replace_terminals(cons[_ranges(conPtr[slots], conPtr[slots + 1])], 
+                self._store_replacement)
+            return (np.concatenate(([0], np.cumsum(termPtr[rows + 1] - termPtr[rows]))), 
+                terms[slots].astype(np.int64), np.concatenate(([0], np.cumsum(conCounts))), 
+                cons.astype(np.int64), len(store._terminal_offsets) - 1, store._find_terminal('GND'))
+        # a terminal's id is its slot in the component that owns it (found 
+        # through the terminal index, so no table of every terminal is built), 
+        # names no component has are numbered after the slots
+        comps = self._circuit_component_list
+        owners = self._terminal_index
+        others = {}
+        termPtr = array('q', [0])
+        conPtr = array('q', [0])
+        # the terminals, and the connections then GND, as (address of the owning 
+        # component or 0, index in its terminals or in others), made ids in place
+        termIds = (array('q'), array('i'))
+        conIds = (array('q'), array('i'))
+        def add(ids, name):
+            owner = owners.get(name)
+            if owner is None:
+                ids[0].append(0)
+                ids[1].append(others.setdefault(name, len(others)))
+            else:
+                ids[0].append(id(owner))
+                ids[1].append(owner.terminals.index(name))
+        for comp in comps:
+            connections = comp.connections
+            for t in comp.terminals:
+                add(termIds, t)
+                for con in connections[t]:
+                    add(conIds, con)
+                conPtr.append(len(conIds[0]))
+            termPtr.append(len(termIds[0]))
+        add(conIds, 'GND')
+        termPtr = np.frombuffer(termPtr, dtype=np.int64)
+        compAddresses = np.fromiter(map(id, comps), dtype=np.int64, count=len(comps))
+        byAddress = np.argsort(compAddresses)
+        compAddresses = compAddresses[byAddress]
+        for addresses, indexes in (termIds, conIds):
+            ids = np.frombuffer(addresses, dtype=np.int64)
+            indexes = np.frombuffer(indexes, dtype=np.int32)
+            for start in range(0, len(ids), self.STREAM_CHUNK):
+                chunk = slice(start, start + self.STREAM_CHUNK)
+                chunkIds = ids[chunk]
+                owned = chunkIds != 0
+                chunkIds[owned] = termPtr[byAddress[np.searchsorted(compAddresses, chunkIds[owned])]]
+                chunkIds[~owned] = termPtr[-1]
+                chunkIds += indexes[chunk]
+        termIds = np.frombuffer(termIds[0], dtype=np.int64)
+        conIds = np.frombuffer(conIds[0], dtype=np.int64)
+        return (termPtr, termIds, np.frombuffer(conPtr, dtype=np.int64), conIds[:-1], 
+            termPtr[-1].item() + len(others), conIds[-1].item())
+
+    # (store rows or None, junction flags) of the components of _get_csr, 
+    # the rows are only given when it cut them out of the store's arrays
+    def _get_csr_rows(self):
+        if self._store_rows is not None and not self._connection_overrides:
+            return self._store_rows, (np.frombuffer(self._store._labels, dtype=np.uint16)[self._store_rows] 
+                == self._store._get_label_code('junction'))
+        comps = self._circuit_component_list
+        return None, np.fromiter((comp.label == 'junction' for comp in comps), dtype=bool, count=len(comps))
+
+    # components ordered by island, islands by their first component:
+    # (order, start of each island in order)
+    def _get_island_order(self, csr):
+        termPtr, terms, conPtr, cons, size, ground = csr
+        # terminals joined by connections that don't go to GND, so that 
+        # every connection list a component's nets depend on is in its island
+        src = np.repeat(terms, np.diff(conPtr))
+        inside = (src != ground) & (cons != ground)
+        labels = _connected_labels(size, src[inside], cons[inside])
+        counts = np.diff(termPtr)
+        slotComps = np.repeat(np.arange(len(counts)), counts)
+        inside = terms != ground
+        # components are items 0..len(counts)-1, the terminals follow
+        islands = _connected_labels(len(counts) + size, 
+            slotComps[inside], len(counts) + labels[terms[inside]])[:len(counts)]
+        order, islandIds, starts = _segments(islands)
+        return order, starts
+
+    # return the ConversionResult of get_conversion_result computed island by island,
+    # without modifying the circuit (as snapshot().conversion_result):
+    # the components are put in island order on CSR arrays once, islands 
+    # are packed into jobs of at least job_size components (ranges of those 
+    # arrays) and converted on integers, in this process, on a multiprocessing 
+    # Pool of processes, or with executor.map (any concurrent.futures executor), 
+    # then the nodes are numbered the way get_nodes numbers them
+    def get_island_conversion_result(self, processes=1, executor=None, job_size=1000):
+        csr = self._get_csr()
+        termPtr, terms, conPtr, cons, size, ground = csr
+        order, starts = self._get_island_order(csr)
+        jobs = []
+        start = 0
+        for end in np.append(starts[1:], len(order)).tolist():
+            if end - start >= job_size:
+                jobs.append((start, end))
+                start = end
+        if start < len(order):
+            jobs.append((start, len(order)))
+
+        storeRows, junction = self._get_csr_rows()
+        slots = _ranges(termPtr[order], termPtr[order + 1])
+        arrays = _IslandJob(order, junction[order], 
+            np.concatenate(([0], np.cumsum(np.diff(termPtr)[order]))), terms[slots], 
+            np.concatenate(([0], np.cumsum(np.diff(conPtr)[slots]))), 
+            cons[_ranges(conPtr[slots], conPtr[slots + 1])], ground)
+        if executor is not None:
+            parts = list(executor.map(_convert_island, [_get_island_job(arrays, *job) for job in jobs]))
+        elif processes > 1:
+            # the arrays go to each process once, the jobs are only ranges
+            with Pool(processes, _set_island_arrays, (arrays,)) as pool:
+                parts = pool.map(_convert_island_range, jobs)
+        else:
+            parts = [_convert_island(_get_island_job(arrays, *job)) for job in jobs]
+
+        kept, groups, owners, low, high, groundNumber = _number_island_edges(parts, len(order))
+
+        if storeRows is not None:
+            names = self._get_store_names(storeRows[kept])
+            getValue = lambda i: self._get_store_value(storeRows[i].item())
+        else:
+            comps = self._circuit_component_list
+            names = [comps[i].name for i in kept.tolist()]
+            getValue = lambda i: comps[i].value
+        memberValues = [getValue(i) for members in groups.values() for i in members]
+        values = dict(zip(groups, _merge_values([value['capacitance'] for value in memberValues], 
+            [value['inductance'] for value in memberValues], [len(members) for members in groups.values()])))
+        del memberValues
+        ownerNames = np.searchsorted(kept, owners).tolist()
+        owners = owners.tolist()
+        nodeTups = {}
+        for owner, ownerName, node1, node2 in zip(owners, ownerNames, low.tolist(), high.tolist()):
+            # lower-numbered node first, GND always second
+            tup = ('n' + str(node1), 'GND' if node2 == groundNumber else 'n' + str(node2))
+            value = values.get(owner)
+            nodeTups[tup] = (value if value is not None else getValue(owner), names[ownerName])
+
+        # same outputs as a conversion of the kept components
+        if storeRows is not None and len(set(names)) == len(names):
+            return self._get_store_outputs(storeRows[kept], names, nodeTups, 
+                storeRows[owners].tolist())
+        comps = self._circuit_component_list
+        keptComps = [comps[i] for i in kept.tolist()]
+        subsystemDict = self.get_component_name_subsystem(keptComps)
+        subSysEdges = self._partition_by_subsystem(nodeTups, subsystemDict, keptComps)
+        return ConversionResult(nodeTups, 
+            self.get_capacitance_graph(nodeTups), 
+            self._get_inductor_list(subSysEdges), 
+            self._get_junction_list(subSysEdges), 
+            self.get_subsystem_map(subsystemDict, nodeTups))
+
+    # return nodeTups and every output derived from it in a ConversionResult,
+    # edges are grouped by subsystem once and shared by all the lists
+    def get_conversion_result(self, nodeTups=None):
+        if nodeTups is None and self._store_rows is not None:
+            return self._get_store_conversion_result()
+        if nodeTups is None:
+            nodeTups = self.get_nodes()
+        subsystemDict = self.get_component_name_subsystem()
+        subSysEdges = self._partition_by_subsystem(nodeTups, subsystemDict)
+        return ConversionResult(nodeTups, 
+            self.get_capacitance_graph(nodeTups), 
+            self._get_inductor_list(subSysEdges), 
+            self._get_junction_list(subSysEdges), 
+            self.get_subsystem_map(subsystemDict, nodeTups))
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##                Store Functions             ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # store rows of the circuit's components (from the views once they exist)
+    def _get_store_rows(self):
+        if self._store_rows is not None:
+            return self._store_rows
+        comps = self._circuit_component_list
+        return np.fromiter((comp._index for comp in comps), dtype=np.int64, count=len(comps))
+
+    # value of a store row in this circuit
+    def _get_store_value(self, row):
+        value = self._value_overrides.get(row)
+        if value is None:
+            value = {'capacitance': self._store._capacitance[row], 
+                'inductance': self._store._inductance[row]}
+        return value
+
+    # names of store rows
+    def _get_store_names(self, rows):
+        offsets = np.frombuffer(self._store._name_offsets, dtype=np.int64)
+        names = self._store._names
+        return [names[start:end].decode() for start, end in 
+            zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+
+    # the terminals of store rows and their connections as the views list 
+    # them (merged-away terminals redirected): (term_ptr, terms, 
+    # slot of each connection, connected terminal ids)
+    def _get_store_connections(self, rows):
+        store = self._store
+        termPtr, terms, conPtr, cons = store._get_csr()
+        slots = _ranges(termPtr[rows], termPtr[rows + 1])
+        conSlots = np.repeat(np.arange(len(slots)), conPtr[slots + 1] - conPtr[slots])
+        cons = cons[_ranges(conPtr[slots], conPtr[slots + 1])]
+        terms = terms[slots].astype(np.int64)
+        replacement = self._store_replacement
+        if replacement:
+            # a list with a merged-away terminal is rewritten without repeats 
+            # or the terminal itself (as _get_redirected_connections does)
+            isReplaced = np.zeros(len(store._terminal_offsets) - 1, dtype=bool)
+            isReplaced[list(replacement)] = True
+            redirected = np.zeros(len(slots), dtype=bool)
+            redirected[conSlots[isReplaced[cons]]] = True
+            cons = store._replace_terminals(cons, replacement).astype(np.int64)
+            first = np.zeros(len(cons), dtype=bool)
+            first[np.unique(conSlots * len(isReplaced) + cons, return_index=True)[1]] = True
+            kept = ~redirected[conSlots] | (first & (cons != terms[conSlots]))
+            conSlots, cons = conSlots[kept], cons[kept]
+        return (np.concatenate(([0], np.cumsum(termPtr[rows + 1] - termPtr[rows]))), 
+            terms, conSlots, cons.astype(np.int64))
+
+    # (positions in rows, first terminal, second terminal) of the rows with 
+    # two terminals on different nets, labels as from ComponentStore._get_net_labels
+    def _get_store_branches(self, rows, labels):
+        termPtr, terms, conPtr, cons = self._store._get_csr()
+        positions = np.flatnonzero(termPtr[rows + 1] - termPtr[rows] == 2)
+        terms1 = terms[termPtr[rows[positions]]]
+        terms2 = terms[termPtr[rows[positions]] + 1]
+        across = labels[terms1] != labels[terms2]
+        return positions[across], terms1[across], terms2[across]
+
+    # convert_parallel on the store arrays: merged-away rows leave _store_rows,
+    # the merged values and terminals are kept in this circuit
+    def _merge_store_rows(self):
+        store = self._store
+        labels = store._get_net_labels(self._store_rows, self._store_replacement)[2]
+        positions, terms1, terms2 = self._get_store_branches(self._store_rows, labels)
+        rows = self._store_rows[positions]
+        # branches (rows across the same pair of nets), rows in order in each
+        net1 = labels[terms1].astype(np.int64)
+        net2 = labels[terms2].astype(np.int64)
+        pairs = np.minimum(net1, net2) * len(labels) + np.maximum(net1, net2)
+        order = np.argsort(pairs, kind='stable')
+        sortedPairs = pairs[order]
+        starts = np.flatnonzero(np.concatenate(([True], sortedPairs[1:] != sortedPairs[:-1])))
+        sizes = np.diff(np.append(starts, len(order)))
+        parallel = sizes > 1
+        members = order[_ranges(starts[parallel], starts[parallel] + sizes[parallel])]
+        if not len(members):
+            return
+        sizes = sizes[parallel]
+        groupStarts = np.cumsum(sizes) - sizes
+
+        # the first junction of a branch is kept, otherwise its first row
+        isJunction = (np.frombuffer(store._labels, dtype=np.uint16)[rows[members]] 
+            == store._get_label_code('junction'))
+        candidates = np.where(isJunction, np.arange(len(members)), len(members))
+        firstJunctions = np.minimum.reduceat(candidates, groupStarts)
+        keepers = np.where(firstJunctions < len(members), firstJunctions, groupStarts)
+
+        memberRows = rows[members].tolist()
+        values = [self._get_store_value(row) for row in memberRows]
+        merged = _merge_values([value['capacitance'] for value in values], 
+            [value['inductance'] for value in values], sizes)
+        for keeper, value in zip(keepers.tolist(), merged):
+            self._value_overrides[memberRows[keeper]] = value
+
+        # every terminal of a removed row goes to the kept terminal on its net
+        # (in the order _merge_parallel visits them, so a terminal shared 
+        # by several rows ends up where it does there)
+        removed = np.ones(len(members), dtype=bool)
+        removed[keepers] = False
+        keptMembers = np.repeat(members[keepers], sizes)[removed]
+        removedMembers = members[removed]
+        visit = np.lexsort((removedMembers, np.repeat(members[groupStarts], sizes)[removed]))
+        keptMembers = keptMembers[visit]
+        removedMembers = removedMembers[visit]
+        replaced = np.stack((terms1[removedMembers], terms2[removedMembers]), axis=1)
+        keptTerms1 = terms1[keptMembers, None]
+        target = np.where(labels[replaced] == labels[keptTerms1], keptTerms1, 
+            terms2[keptMembers, None])
+        self._store_replacement.update(zip(replaced.ravel().tolist(), target.ravel().tolist()))
+        self._store_rows = self._store_rows[~np.isin(self._store_rows, rows[removedMembers])]
+
+    # get_nodes on the merged store arrays, names are those of _store_rows 
+    # if given, return (nodeTups, the row behind each edge in nodeTups order)
+    def _get_store_nodes(self, names=None):
+        store = self._store
+        rows = self._store_rows
+        slots, dst, labels = store._get_net_labels(rows, self._store_replacement)
+        terms = np.frombuffer(store._terms, dtype=np.int32)
+        ground = store._find_terminal('GND')
+        groundNet = labels[ground] if ground >= 0 else -1
+        # nodes are numbered in order of first appearance, GND is numbered last
+        nets, firsts = np.unique(labels[terms[slots]], return_index=True)
+        firsts = firsts[nets != groundNet]
+        nets = nets[nets != groundNet]
+        number = np.zeros(len(labels), dtype=np.int64)
+        number[nets[np.argsort(firsts)]] = np.arange(1, len(nets) + 1)
+        if ground >= 0:
+            number[groundNet] = len(nets) + 1
+
+        positions, terms1, terms2 = self._get_store_branches(rows, labels)
+        numbers1 = number[labels[terms1]]
+        numbers2 = number[labels[terms2]]
+        owners = {}
+        for position, low, high in zip(positions.tolist(), 
+                np.minimum(numbers1, numbers2).tolist(), np.maximum(numbers1, numbers2).tolist()):
+            # lower-numbered node first, GND always second
+            tup = ('n' + str(low), 'GND' if high > len(nets) else 'n' + str(high))
+            # parallel edges to GND overwrite, others keep the first one
+            if high > len(nets) or tup not in owners:
+                owners[tup] = position
+        edgeRows = rows[list(owners.values())]
+        if names is None:
+            edgeNames = self._get_store_names(edgeRows)
+        else:
+            edgeNames = [names[position] for position in owners.values()]
+        edgeRows = edgeRows.tolist()
+        nodeTups = {tup: (self._get_store_value(row), name) 
+            for tup, row, name in zip(owners, edgeRows, edgeNames)}
+        return nodeTups, edgeRows
+
+    # get_conversion_result on the store arrays
+    # (same as the component path, which looks edges up by component name, 
+    # so circuits with duplicate names go through it)
+    def _get_store_conversion_result(self):
+        self.convert_parallel()
+        rows = self._store_rows
+        names = self._get_store_names(rows)
+        if len(set(names)) < len(names):
+            return self.get_conversion_result(self._get_store_nodes(names)[0])
+        nodeTups, edgeRows = self._get_store_nodes(names)
+        return self._get_store_outputs(rows, names, nodeTups, edgeRows)
+
+    # ConversionResult of nodeTups converted from the store rows (with 
+    # their names, all different) and the row behind each edge of nodeTups
+    def _get_store_outputs(self, rows, names, nodeTups, edgeRows):
+        store = self._store
+        # subsystems (except '') in order of first appearance, 
+        # with their rows' positions in order
+        codes = np.frombuffer(store._subsystems, dtype=np.int32)[rows]
+        order = np.argsort(codes, kind='stable')
+        sortedCodes = codes[order]
+        starts = np.flatnonzero(np.concatenate(([True], sortedCodes[1:] != sortedCodes[:-1])))
+        ends = np.append(starts[1:], len(order))
+        positions = {}
+        for start, end in sorted(zip(starts.tolist(), ends.tolist()), key=lambda run: order[run[0]]):
+            subsystem = store._subsystem_table[sortedCodes[start]]
+            if subsystem != '':
+                positions[subsystem] = order[start:end].tolist()
+
+        rowTups = dict(zip(edgeRows, nodeTups))
+        subsystemMap = {}
+        for subsystem, subsystemPositions in positions.items():
+            entries = []
+            seen = set()
+            for position in subsystemPositions:
+                # components without an edge are kept by name
+                tup = rowTups.get(rows[position].item())
+                for entry in tup if tup is not None else (names[position],):
+                    if entry not in seen:
+                        seen.add(entry)
+                        entries.append(entry)
+            subsystemMap[subsystem] = entries
+
+        # one inductor and one junction dict per subsystem
+        junction = store._get_label_code('junction')
+        subsystemCodes = np.frombuffer(store._subsystems, dtype=np.int32)
+        labelCodes = np.frombuffer(store._labels, dtype=np.uint16)
+        inductorDicts = {subsystem: {} for subsystem in positions}
+        junctionDicts = {subsystem: {} for subsystem in positions}
+        for tup, row in zip(nodeTups, edgeRows):
+            subsystem = store._subsystem_table[subsystemCodes[row]]
+            if subsystem in inductorDicts:
+                val, name = nodeTups[tup]
+                if val['inductance'] > 0:
+                    inductorDicts[subsystem][tup] = val['inductance']
+                if labelCodes[row] == junction:
+                    junctionDicts[subsystem][tup] = name
+        return ConversionResult(nodeTups, self.get_capacitance_graph(nodeTups), 
+            [ind for ind in inductorDicts.values() if ind], 
+            [junc for junc in junctionDicts.values() if junc], subsystemMap)
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##           Incremental Functions            ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # record an edit to comp for the next update_conversion_result,
+    # topology is True when its terminals, connections or label changed 
+    # (the CircuitComponent setters call this, call it yourself 
+    # after editing a connection list in place)
+    def mark_dirty(self, comp, topology=True):
+        self._dirty[comp] = self._dirty.get(comp, False) or topology
+
+    # return the ConversionResult of the circuit, the first call converts 
+    # the whole circuit, later calls only redo the nodes and edges touched 
+    # by edits since the last call (existing node names are kept),
+    # the returned nodeTups and capacitance graph are updated in place
+    def update_conversion_result(self):
+        if self._state is None:
+            self._build_incremental_state()
+        elif self._dirty:
+            self._apply_edits()
+        state = self._state
+        return ConversionResult(state.node_tups, state.capacitance_graph, 
+            [ind for ind in state.inductors.values() if ind], 
+            [junc for junc in state.junctions.values() if junc], 
+            state.subsystem_map)
+
+    # full conversion, remembering enough to update it later
+    def _build_incremental_state(self):
+        nodeTups, nets, nodeNames = self._extract_nodes()
+        self._dirty = {}
+        state = self._state = _IncrementalState()
+        for t in nets:
+            root = nets.find(t)
+            if root in nodeNames:
+                name, number = nodeNames[root]
+                state.terminal_node[t] = name
+                state.node_terminals.setdefault(name, set()).add(t)
+                state.node_number[name] = number
+        # nodeNames also holds GND
+        state.next_node = len(nodeNames)
+
+        for position, comp in enumerate(self._circuit_component_list):
+            state.position[comp] = position
+            state.comp_terminals[comp] = tuple(comp.terminals)
+            self._join_subsystem(comp)
+            pair = self._get_comp_pair(comp)
+            state.comp_pair[comp] = pair
+            if pair is not None:
+                state.pair_comps.setdefault(pair, []).append(comp)
+
+        for tup in nodeTups:
+            self._set_edge(tup, self._name_index[nodeTups[tup][1]])
+        for subSys in state.inductors:
+            self._update_subsystem_map(subSys)
+
+    # redo the nodes and edges touched by the dirty components
+    def _apply_edits(self):
+        state = self._state
+        dirty = self._dirty
+        self._dirty = {}
+        rewired = []
+        edited = []
+        for comp in dirty:
+            # merged away or cleared components are no longer converted
+            if comp._circuit is self._ref and comp in state.position:
+                (rewired if dirty[comp] else edited).append(comp)
+
+        # subsystem map entries to rebuild, a value edit leaves them as they are
+        subsystems = set()
+        for comp in rewired + edited:
+            oldSubSys = state.comp_subsystem[comp]
+            if comp.subsystem != oldSubSys:
+                del state.subsystem_comps[oldSubSys][comp]
+                self._join_subsystem(comp)
+                subsystems.add(oldSubSys)
+                subsystems.add(comp.subsystem)
+            elif dirty[comp] or comp not in state.comp_edge:
+                # an edgeless comp is listed by its name, which may have changed
+                subsystems.add(comp.subsystem)
+
+        affected = self._rewire_nodes(rewired) if rewired else []
+        for comp in affected:
+            tup = state.comp_edge.get(comp)
+            if tup is not None:
+                self._drop_edge(tup)
+            pair = state.comp_pair.pop(comp)
+            if pair is not None:
+                state.pair_comps[pair].remove(comp)
+                if not state.pair_comps[pair]:
+                    del state.pair_comps[pair]
+
+        for comp in self._merge_parallel(affected, state.terminal_node.get):
+            del state.position[comp]
+            del state.comp_terminals[comp]
+            subSys = state.comp_subsystem.pop(comp)
+            del state.subsystem_comps[subSys][comp]
+            subsystems.add(subSys)
+
+        pairs = {}
+        for comp in affected:
+            if comp._circuit is not self._ref:
+                continue
+            state.comp_terminals[comp] = tuple(comp.terminals)
+            subsystems.add(comp.subsystem)
+            pair = self._get_comp_pair(comp)
+            state.comp_pair[comp] = pair
+            if pair is not None:
+                state.pair_comps.setdefault(pair, []).append(comp)
+                pairs[pair] = None
+        for pair in pairs:
+            comps = sorted(state.pair_comps[pair], key=state.position.get)
+            state.pair_comps[pair] = comps
+            # same owner as a full run: 
+            # parallel edges to GND overwrite, others keep the first one
+            owner = comps[-1] if 'GND' in pair else comps[0]
+            node1, node2 = sorted(pair, key=state.node_number.get)
+            self._set_edge((node1, node2), owner)
+
+        for comp in edited:
+            if comp._circuit is not self._ref:
+                continue
+            tup = state.comp_edge.get(comp)
+            if tup is not None:
+                self._set_edge(tup, comp)
+
+        for subSys in subsystems:
+            self._update_subsystem_map(subSys)
+
+    # re-extract the nodes the rewired comps were or are now connected to,
+    # return every comp with a terminal on those nodes, in component order
+    def _rewire_nodes(self, rewired):
+        state = self._state
+        terminalNode = state.terminal_node
+        nodes = set()
+        terminals = set()
+        for comp in rewired:
+            terms = set(state.comp_terminals[comp])
+            terms.update(comp.terminals)
+            for t in comp.terminals:
+                terms.update(comp.connections[t])
+            for t in terms:
+                node = terminalNode.get(t)
+                if node is None:
+                    terminals.add(t)
+                else:
+                    nodes.add(node)
+        for node in nodes:
+            terminals.update(state.node_terminals.pop(node))
+        oldNode = {}
+        for t in terminals:
+            if t in terminalNode:
+                oldNode[t] = terminalNode.pop(t)
+
+        # the affected terminals only connect among themselves
+        nets = DisjointSet()
+        for t in sorted(terminals):
+            nets.add(t)
+        for t in sorted(terminals):
+            comp = self._terminal_index.get(t)
+            if comp is not None:
+                for con in comp.connections[t]:
+                    nets.add(con)
+                    nets.union(t, con)
+        groups = {}
+        for t in nets:
+            groups.setdefault(nets.find(t), []).append(t)
+
+        # name the new nodes, reusing the old names where possible
+        taken = set()
+        unnamed = []
+        for members in sorted(groups.values(), key=lambda members: min(
+            [state.node_number[oldNode[t]] for t in members if t in oldNode], 
+            default=float('inf'))):
+            # nodes without a component terminal are dropped
+            if not ('GND' in members 
+                or any(t in self._terminal_index for t in members)):
+                continue
+            if 'GND' in members:
+                name = 'GND'
+            else:
+                name = min((oldNode[t] for t in members 
+                    if t in oldNode and oldNode[t] not in taken and oldNode[t] != 'GND'), 
+                    key=state.node_number.get, default=None)
+            if name is None:
+                unnamed.append(members)
+                continue
+            taken.add(name)
+            self._set_node(name, members)
+        for members in unnamed:
+            name = 'n' + str(state.next_node)
+            state.node_number[name] = state.next_node
+            state.next_node += 1
+            self._set_node(name, members)
+        for node in nodes:
+            if node not in state.node_terminals:
+                del state.node_number[node]
+
+        affected = set(rewired)
+        for t in terminals:
+            comp = self._terminal_index.get(t)
+            if comp is not None:
+                affected.add(comp)
+        return sorted(affected, key=state.position.get)
+
+    def _set_node(self, name, terminals):
+        self._state.node_terminals[name] = set(terminals)
+        for t in terminals:
+            self._state.terminal_node[t] = name
+
+    # frozenset of comp's two nodes, None if it doesn't make an edge
+    def _get_comp_pair(self, comp):
+        if len(comp.terminals) != 2:
+            return None
+        node1 = self._state.terminal_node.get(comp.terminals[0])
+        node2 = self._state.terminal_node.get(comp.terminals[1])
+        if node1 is None or node2 is None or node1 == node2:
+            return None
+        return frozenset((node1, node2))
+
+    def _join_subsystem(self, comp):
+        state = self._state
+        subSys = comp.subsystem
+        state.comp_subsystem[comp] = subSys
+        state.subsystem_comps.setdefault(subSys, {})[comp] = None
+        if subSys != '' and subSys not in state.inductors:
+            state.inductors[subSys] = {}
+            state.junctions[subSys] = {}
+
+    # make comp the owner of edge tup and update every output
+    def _set_edge(self, tup, comp):
+        state = self._state
+        oldOwner = state.edge_owner.get(tup)
+        if oldOwner is not None and oldOwner is not comp:
+            del state.comp_edge[oldOwner]
+        state.edge_owner[tup] = comp
+        state.comp_edge[comp] = tup
+        val = comp.value
+        state.node_tups[tup] = (val, comp.name)
+
+        node1, node2 = tup
+        capGraph = state.capacitance_graph
+        if val['capacitance'] > 0:
+            capGraph.setdefault(node1, {})[node2] = val['capacitance']
+        elif node2 in capGraph.get(node1, ()):
+            del capGraph[node1][node2]
+            if not capGraph[node1]:
+                del capGraph[node1]
+
+        subSys = comp.subsystem
+        oldSubSys = state.edge_subsystem.get(tup, subSys)
+        if oldSubSys != subSys and oldSubSys in state.inductors:
+            state.inductors[oldSubSys].pop(tup, None)
+            state.junctions[oldSubSys].pop(tup, None)
+        state.edge_subsystem[tup] = subSys
+        if subSys in state.inductors:
+            if val['inductance'] > 0:
+                state.inductors[subSys][tup] = val['inductance']
+            else:
+                state.inductors[subSys].pop(tup, None)
+            if comp.label == 'junction':
+                state.junctions[subSys][tup] = comp.name
+            else:
+                state.junctions[subSys].pop(tup, None)
+
+    # remove edge tup from every output
+    def _drop_edge(self, tup):
+        state = self._state
+        del state.comp_edge[state.edge_owner.pop(tup)]
+        del state.node_tups[tup]
+        node1, node2 = tup
+        if node2 in state.capacitance_graph.get(node1, ()):
+            del state.capacitance_graph[node1][node2]
+            if not state.capacitance_graph[node1]:
+                del state.capacitance_graph[node1]
+        subSys = state.edge_subsystem.pop(tup)
+        if subSys in state.inductors:
+            state.inductors[subSys].pop(tup, None)
+            state.junctions[subSys].pop(tup, None)
+
+    # same entry as get_subsystem_map, for one subsystem
+    def _update_subsystem_map(self, subSys):
+        state = self._state
+        comps = state.subsystem_comps.get(subSys)
+        if subSys == '':
+            return
+        if not comps:
+            state.subsystem_comps.pop(subSys, None)
+            state.subsystem_map.pop(subSys, None)
+            state.inductors.pop(subSys, None)
+            state.junctions.pop(subSys, None)
+            return
+        entries = []
+        seen = set()
+        for comp in comps:
+            tup = state.comp_edge.get(comp)
+            for entry in (tup if tup is not None else (comp.name,)):
+                if entry not in seen:
+                    seen.add(entry)
+                    entries.append(entry)
+        state.subsystem_map[subSys] = entries
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##            Validation Functions            ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # check the components before converting them, return a ValidationReport 
+    # of every duplicate name, component with no or more than two terminals,
+    # terminal on several components or without a connections entry,
+    # connection to an unknown terminal and one-sided connection ('GND' is 
+    # always known), names and terminals are encoded as integers in one pass 
+    # (a store's rows already are) and the checks run on the arrays
+    def validate_connectivity(self):
+        report = ValidationReport()
+        if self._store_rows is not None and not self._connection_overrides:
+            store = self._store
+            names = self._get_store_names(self._store_rows)
+            termPtr, terms, conSlots, conTerms = self._get_store_connections(self._store_rows)
+            size = len(store._terminal_offsets) - 1
+            ground = store._find_terminal('GND')
+            getTerminal = store._get_terminal
+        else:
+            comps = self._circuit_component_list
+            names = [comp.name for comp in comps]
+            # terminal -> id, GND is 0
+            terminalIds = {'GND': 0}
+            termPtr = array('q', [0])
+            terms = array('q')
+            # connection (src terminal slot, dst terminal id) pairs
+            conSlots = array('q')
+            conTerms = array('q')
+            for comp in comps:
+                connections = comp.connections
+                for t in comp.terminals:
+                    slot = len(terms)
+                    terms.append(terminalIds.setdefault(t, len(terminalIds)))
+                    cons = connections.get(t)
+                    if cons is None:
+                        report.missing_connections.append((comp.name, t))
+                        continue
+                    conSlots.extend([slot] * len(cons))
+                    conTerms.extend([terminalIds.setdefault(con, len(terminalIds)) for con in cons])
+                termPtr.append(len(terms))
+            termPtr = np.frombuffer(termPtr, dtype=np.int64)
+            terms = np.frombuffer(terms, dtype=np.int64)
+            conSlots = np.frombuffer(conSlots, dtype=np.int64)
+            conTerms = np.frombuffer(conTerms, dtype=np.int64)
+            size = len(terminalIds)
+            ground = 0
+            getTerminal = list(terminalIds).__getitem__
+        nameCodes = {}
+        nameIds = np.fromiter((nameCodes.setdefault(name, len(nameCodes)) for name in names), 
+            dtype=np.int64, count=len(names))
+        # component of each terminal slot
+        slotComps = np.repeat(np.arange(len(names)), np.diff(termPtr))
+
+        for group in _get_duplicate_groups(nameIds):
+            report.duplicate_names.append((names[group[0]], group))
+        termCounts = np.diff(termPtr)
+        for i in np.flatnonzero(termCounts == 0).tolist():
+            report.no_terminals.append(names[i])
+        for i in np.flatnonzero(termCounts > 2).tolist():
+            report.too_many_terminals.append((names[i], int(termCounts[i])))
+
+        for group in _get_duplicate_groups(terms):
+            report.duplicate_terminals.append((getTerminal(terms[group[0]].item()), 
+                [names[i] for i in slotComps[group].tolist()]))
+        isTerminal = np.zeros(size, dtype=bool)
+        isTerminal[terms] = True
+        if ground >= 0:
+            isTerminal[ground] = True
+
+        conComps = slotComps[conSlots]
+        conSources = terms[conSlots]
+        unknown = ~isTerminal[conTerms]
+        for i, src, dst in zip(conComps[unknown].tolist(), conSources[unknown].tolist(), 
+            conTerms[unknown].tolist()):
+            report.unknown_terminals.append((names[i], getTerminal(src), getTerminal(dst)))
+        # every terminal-to-terminal connection needs its reverse
+        checked = ~unknown & (conTerms != ground)
+        pairs = np.sort(conSources * size + conTerms)
+        reverse = conTerms * size + conSources
+        oneSided = checked & (np.searchsorted(pairs, reverse) == np.searchsorted(pairs, reverse, side='right'))
+        for i, src, dst in zip(conComps[oneSided].tolist(), conSources[oneSided].tolist(), 
+            conTerms[oneSided].tolist()):
+            report.asymmetric_connections.append((names[i], getTerminal(src), getTerminal(dst)))
+        return report
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##            Profiling Functions             ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # context manager timing the conversion stages and counting lookups 
+    # run on this circuit inside the with block, e.g.
+    #   with circuit.profile() as profile:
+    #       circuit.get_conversion_result()
+    #   profile.as_dict()
+    # the methods are only wrapped on this instance while the block runs,
+    # so an unprofiled circuit pays nothing
+    @contextmanager
+    def profile(self, callback=None):
+        profile = ConversionProfile(callback)
+        # instance attributes shadow the methods, keep any outer profile's
+        previous = {}
+        for method in list(profile.STAGES) + list(profile.COUNTED):
+            previous[method] = self.__dict__.get(method)
+            if method in profile.STAGES:
+                setattr(self, method, profile._timed(method, getattr(self, method)))
+            else:
+                setattr(self, method, profile._counted(method, getattr(self, method)))
+        try:
+            yield profile
+        finally:
+            for method, function in previous.items():
+                if function is None:
+                    del self.__dict__[method]
+                else:
+                    setattr(self, method, function)
+
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##               File Functions               ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # write the ConversionResult of nodeTups (or result, if given) 
+    # to path in the ConversionFile format
+    def write_conversion_result(self, path, nodeTups=None, result=None):
+        if result is None:
+            result = self.get_conversion_result(nodeTups)
+        ConversionFile.write(path, result)
+
+    # open a file written by write_conversion_result, 
+    # its ConversionFile reads the outputs on demand
+    @staticmethod
+    def read_conversion_result(path):
+        return ConversionFile(path)
 
 
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    ##            Streaming Functions             ##
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # the whole circuit converted as one island job: (store rows or None, 
+    # _number_island_edges without the kept positions)
+    def _number_edges(self):
+        termPtr, terms, conPtr, cons, size, ground = self._get_csr()
+        storeRows, junction = self._get_csr_rows()
+        count = len(termPtr) - 1
+        part = _convert_terminals(_IslandJob(np.arange(count), junction, 
+            termPtr, terms, conPtr, cons, ground), size)
+        return (storeRows,) + _number_island_edges([part], count)[1:]
+
+    # generate the edges of get_nodes as (node1, node2, value, component name),
+    # in nodeTups order and with parallel components merged, without modifying
+    # the circuit or building nodeTups: the circuit is converted on its CSR 
+    # arrays as one island, only the edges are kept from there, and names and 
+    # values are looked up a chunk of edges at a time
+    def iter_edges(self):
+        storeRows, groups, owners, low, high, groundNumber = self._number_edges()
+        if storeRows is not None:
+            getNames = lambda positions: self._get_store_names(storeRows[positions])
+            getValue = lambda i: self._get_store_value(storeRows[i].item())
+        else:
+            comps = self._circuit_component_list
+            getNames = lambda positions: [comps[i].name for i in positions.tolist()]
+            getValue = lambda i: comps[i].value
+        # converted to python in chunks to keep the state bounded
+        for start in range(0, len(owners), self.STREAM_CHUNK):
+            chunk = slice(start, start + self.STREAM_CHUNK)
+            chunkOwners = owners[chunk].tolist()
+            # the merged values of the chunk's groups at once
+            keepers = [owner for owner in chunkOwners if owner in groups]
+            memberValues = [getValue(i) for keeper in keepers for i in groups[keeper]]
+            values = dict(zip(keepers, _merge_values([value['capacitance'] for value in memberValues], 
+                [value['inductance'] for value in memberValues], [len(groups[keeper]) for keeper in keepers])))
+            for owner, name, node1, node2 in zip(chunkOwners, getNames(owners[chunk]), 
+                    low[chunk].tolist(), high[chunk].tolist()):
+                value = values.get(owner)
+                if value is None:
+                    value = getValue(owner)
+                yield ('n' + str(node1), 'GND' if node2 == groundNumber else 'n' + str(node2), 
+                    value, name)
+
+
+# immutable snapshot of a circuit: conversion runs on read-only copies of the 
+# components without merging anything in place, and every output below is 
+# computed on first access, then shared by all consumers (do not modify them)
+class CircuitSnapshot(object):
+
+    def __init__(self, components):
+        self.components = tuple(FrozenComponent.from_component(comp) for comp in components)
+        # indexes the copies for the (non-mutating) Circuit helpers
+        self._circuit = Circuit(list(self.components))
+
+    @cached_property
+    def nets(self):
+        return self._circuit.get_nets()
+
+    # groups of parallel components, each merges into its first component
+    @cached_property
+    def parallel_groups(self):
+        return tuple(tuple(group) for group in 
+            self._circuit._get_parallel_groups(self.components, self.nets.find))
+
+    # components after parallel merging, as convert_parallel leaves them:
+    # kept components carry the merged value and connections pointing 
+    # at kept terminals (unchanged components are shared with self.components)
+    @cached_property
+    def reduced_components(self):
+        nodeOf = self.nets.find
+        merged = {}
+        removed = set()
+        # removed terminal -> kept terminal on the same node
+        replacement = {}
+        for group, value in zip(self.parallel_groups, _get_merged_values(self.parallel_groups)):
+            keep = group[0]
+            merged[keep] = value
+            keepTerms = {nodeOf(t): t for t in keep.terminals}
+            for comp in group[1:]:
+                removed.add(comp)
+                for t in comp.terminals:
+                    replacement[t] = keepTerms[nodeOf(t)]
+        reduced = []
+        for comp in self.components:
+            if comp in removed:
+                continue
+            connections = {}
+            for t in comp.terminals:
+                newCons = _get_redirected_connections(t, comp.connections[t], replacement)
+                if newCons is not None:
+                    connections[t] = newCons
+            if comp in merged or connections:
+                connections = dict(comp.connections, **connections)
+                comp = FrozenComponent(comp.name, comp.label, comp.terminals, 
+                    merged.get(comp, comp.value), connections, comp.subsystem)
+            reduced.append(comp)
+        return tuple(reduced)
+
+    @cached_property
+    def _reduced_circuit(self):
+        return Circuit(list(self.reduced_components))
+
+    # ({(node1, node2): component}, {net representative: (node name, number)})
+    @cached_property
+    def _edge_owners(self):
+        return self._circuit._get_edge_owners(self.reduced_components, self.nets)
+
+    # {(node1, node2): (value, component name)}, as get_nodes returns it
+    # (values are plain dicts, copied from the read-only component values)
+    @cached_property
+    def node_tups(self):
+        return {tup: (dict(comp.value), comp.name) for tup, comp in self._edge_owners[0].items()}
+
+    @cached_property
+    def subsystem_dict(self):
+        return self._reduced_circuit.get_component_name_subsystem()
+
+    @cached_property
+    def _subsystem_edges(self):
+        return self._reduced_circuit._partition_by_subsystem(self.node_tups, self.subsystem_dict)
+
+    @cached_property
+    def capacitance_graph(self):
+        return self._reduced_circuit.get_capacitance_graph(self.node_tups)
+
+    @cached_property
+    def inductor_list(self):
+        return self._reduced_circuit._get_inductor_list(self._subsystem_edges)
+
+    @cached_property
+    def junction_list(self):
+        return self._reduced_circuit._get_junction_list(self._subsystem_edges)
+
+    @cached_property
+    def subsystem_map(self):
+        return self._reduced_circuit.get_subsystem_map(self.subsystem_dict, self.node_tups)
+
+    @cached_property
+    def conversion_result(self):
+        return ConversionResult(self.node_tups, self.capacitance_graph, 
+            self.inductor_list, self.junction_list, self.subsystem_map)
+
+
+# a cell (e.g. a transmon with its readout) defined once and instanced many times:
+# the cell's components are reduced (parallel merged) when the template is made,
+# instances are copies of the reduced cell named '<instance>.<name>' whose 
+# ports are bound to terminals of the surrounding circuit
+# (ports: {port name: terminal of the cell}, any terminal on the port's node works)
+class SubcircuitTemplate(Subsystem):
+
+    def __init__(self, name, components, ports, sys_label='SUBCIRCUIT', options=None):
+        super().__init__(name, sys_label, options, list(ports))
+        snapshot = CircuitSnapshot(components)
+        self._components = list(snapshot.reduced_components)
+        self._cell = [(comp.name, comp.label, comp.terminals, dict(comp.value), 
+            {t: list(comp.connections[t]) for t in comp.terminals}, comp.subsystem) 
+            for comp in self._components]
+        # port -> a kept terminal on the port's node
+        nodeTerminal = {}
+        for comp in self._components:
+            for t in comp.terminals:
+                nodeTerminal.setdefault(snapshot.nets.find(t), t)
+        self._port_terminals = {}
+        for port, terminal in ports.items():
+            if terminal not in snapshot.nets:
+                raise Exception("Port " + port + " terminal " + terminal + " doesn't exist in " + name)
+            self._port_terminals[port] = nodeTerminal.get(snapshot.nets.find(terminal))
+
+    @property
+    def components(self):
+        return self._components
+
+    # return the terminal of an instance that port is bound to, 
+    # external components list it in their connections to the instance
+    def port_terminal(self, instance, port):
+        if port not in self._port_terminals:
+            raise Exception("Port " + port + " doesn't exist in " + self._name)
+        return instance + '.' + self._port_terminals[port]
+
+    # return the components of one instance as new CircuitComponents,
+    # bindings: {port: external terminal or list of them ('GND' for ground)},
+    # the external terminals should list port_terminal(instance, port) back,
+    # subsystems of the cell become '<instance>.<subsystem>'
+    def instantiate(self, instance, bindings=None):
+        prefix = instance + '.'
+        external = {}
+        for port, terminals in (bindings or {}).items():
+            if port not in self._port_terminals:
+                raise Exception("Port " + port + " doesn't exist in " + self._name)
+            if isinstance(terminals, str):
+                terminals = [terminals]
+            external.setdefault(self._port_terminals[port], []).extend(terminals)
+        comps = []
+        for name, label, terminals, value, connections, subsystem in self._cell:
+            comps.append(CircuitComponent(prefix + name, label, 
+                tuple(prefix + t for t in terminals), dict(value), 
+                {prefix + t: [c if c == 'GND' else prefix + c for c in connections[t]] 
+                    + external.get(t, []) for t in terminals}, 
+                prefix + subsystem if subsystem else subsystem))
+        return comps
+
+
+# conversion of one circuit topology for many sets of component values:
+# connectivity, parallel merging and node numbering are done once,
+# values are then passed as (n_points x n_components) arrays 
+# with one column per component (in component_names order)
+class ParameterSweep(object):
+
+    def __init__(self, circuit):
+        """
+        Prepare a sweep over the components of circuit, the circuit is not modified
+        (build it before get_nodes to sweep the unmerged components)
+        """
+        comps = list(circuit._circuit_component_list)
+        position = {comp: i for i, comp in enumerate(comps)}
+        nets = circuit.get_nets()
+        # kept comp -> comps merged into it
+        members = {}
+        merged = set()
+        for group in circuit._get_parallel_groups(comps, nets.find):
+            members[group[0]] = group
+            merged.update(group[1:])
+        edgeOwners, nodeNames = circuit._get_edge_owners(
+            [comp for comp in comps if comp not in merged], nets)
+
+        self.component_names = [comp.name for comp in comps]
+        # edges in nodeTups order, the columns of edge_values
+        self.edges = list(edgeOwners)
+        self._capacitance = np.array([comp.value['capacitance'] for comp in comps], dtype=float)
+        self._inductance = np.array([comp.value['inductance'] for comp in comps], dtype=float)
+        # component columns of edge e are _member_columns[_edge_starts[e]:_edge_starts[e + 1]]
+        memberColumns = []
+        edgeStarts = []
+        for owner in edgeOwners.values():
+            edgeStarts.append(len(memberColumns))
+            memberColumns.extend(position[comp] for comp in members.get(owner, (owner,)))
+        self._member_columns = np.array(memberColumns, dtype=np.intp)
+        self._edge_starts = np.array(edgeStarts, dtype=np.intp)
+
+        # matrix rows/columns, same order as Circuit.get_node_matrices
+        nodeIndex = {'GND': -1}
+        self.nodes = []
+        for tup in self.edges:
+            for node in tup:
+                if node not in nodeIndex:
+                    nodeIndex[node] = len(self.nodes)
+                    self.nodes.append(node)
+        # Laplacian entries (flat index, edge, sign), sorted by flat index
+        size = len(self.nodes)
+        entries = []
+        for e, (node1, node2) in enumerate(self.edges):
+            i, j = nodeIndex[node1], nodeIndex[node2]
+            for row, col, sign in ((i, i, 1), (j, j, 1), (i, j, -1), (j, i, -1)):
+                if row >= 0 and col >= 0:
+                    entries.append((row * size + col, e, sign))
+        entries.sort()
+        entries = np.array(entries, dtype=np.intp).reshape(-1, 3)
+        self._entry_edges = entries[:, 1]
+        self._entry_signs = entries[:, 2]
+        self._flat_index, self._flat_starts = np.unique(entries[:, 0], return_index=True)
+
+    # return (capacitance, inductance) of every edge at every point,
+    # both (n_points x n_edges), columns in self.edges order,
+    # values default to the current component values
+    def edge_values(self, capacitance=None, inductance=None):
+        caps, invInds = self._get_edge_weights(capacitance, inductance)
+        inds = np.zeros_like(invInds)
+        np.divide(1, invInds, out=inds, where=invInds > 0)
+        return caps, inds
+
+    # return the node list and the stacked Maxwell capacitance and 
+    # inverse-inductance matrices, both (n_points x n_nodes x n_nodes)
+    def matrices(self, capacitance=None, inductance=None):
+        caps, invInds = self._get_edge_weights(capacitance, inductance)
+        return self.nodes, self._scatter(caps), self._scatter(invInds)
+
+    # capacitance and inverse inductance of every edge at every point
+    def _get_edge_weights(self, capacitance, inductance):
+        capacitance = self._get_columns(capacitance, self._capacitance)
+        inductance = self._get_columns(inductance, self._inductance)
+        points = max(len(capacitance), len(inductance))
+        capacitance = np.broadcast_to(capacitance, (points, len(self.component_names)))
+        inductance = np.broadcast_to(inductance, (points, len(self.component_names)))
+        # inductance 0 means no inductive path
+        invInductance = np.zeros(inductance.shape)
+        np.divide(1, inductance, out=invInductance, where=inductance > 0)
+        if not self.edges:
+            return np.zeros((points, 0)), np.zeros((points, 0))
+        # capacitance adds, inductance adds inversely
+        caps = np.add.reduceat(capacitance[:, self._member_columns], self._edge_starts, axis=1)
+        invInds = np.add.reduceat(invInductance[:, self._member_columns], self._edge_starts, axis=1)
+        return caps, invInds
+
+    def _get_columns(self, values, default):
+        if values is None:
+            return default[np.newaxis, :]
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[np.newaxis, :]
+        if values.ndim != 2 or values.shape[1] != len(self.component_names):
+            raise ValueError('expected values of shape (n_points, ' 
+                + str(len(self.component_names)) + '), got ' + str(values.shape))
+        return values
+
+    def _scatter(self, weights):
+        size = len(self.nodes)
+        stack = np.zeros((len(weights), size * size))
+        if len(self._entry_edges):
+            data = weights[:, self._entry_edges] * self._entry_signs
+            stack[:, self._flat_index] = np.add.reduceat(data, self._flat_starts, axis=1)
+        return stack.reshape(len(weights), size, size)
+
+
+# content-addressed cache of conversion results:
+# circuits are keyed by a hash of their labels, values, subsystems and 
+# connectivity that does not depend on component order or naming, 
+# so renamed/reordered copies of a circuit share one entry,
+# entries are kept in memory (least recently used dropped past max_bytes)
+# and, when directory is given, also as files there
+class ConversionCache(object):
+
+    def __init__(self, max_bytes=64 * 2**20, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        # key -> pickled entry, least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, circuit):
+        return self.get_key(circuit) in self._entries
+
+    def get_stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 
+            'misses': self.misses, 'evictions': self.evictions, 
+            'entries': len(self._entries), 'bytes': self._bytes}
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    # return the cache key (hex digest) of circuit, None if it is not cached
+    def get_key(self, circuit):
+        return self._get_labels(circuit)[0]
+
+    # return the ConversionResult of circuit, the circuit is not modified
+    # (on a hit from a reordered copy, node_tups follows this circuit's order,
+    # the order of the other lists follows the circuit that filled the entry)
+    def get_conversion_result(self, circuit):
+        key, comps, nets, compLabels, netLabels = self._get_labels(circuit)
+        entry = self._get_entry(key) if key is not None else None
+        if entry is not None:
+            removed, packed = pickle.loads(entry)
+            removed = set(removed)
+            kept = [comp for comp, label in zip(comps, compLabels) if label not in removed]
+            # nodes named as get_nodes would name them in this circuit
+            edgeOwners, nodeNames = circuit._get_edge_owners(kept, nets)
+            nodeMap = {netLabels[root]: name for root, (name, number) in nodeNames.items()}
+            compMap = {label: comp.name for comp, label in zip(comps, compLabels)}
+            return _relabel_result(ConversionResult.unpack(packed), nodeMap, compMap, 
+                dict(nodeNames.values()), edgeOwners)
+
+        self.misses += 1
+        # convert a copy, the circuit's own components are left unmerged
+        copies = [CircuitComponent(comp.name, comp.label, tuple(comp.terminals), 
+            dict(comp.value), {t: list(cons) for t, cons in comp.connections.items()}, 
+            comp.subsystem) for comp in comps]
+        # the copies are released with the circuit on exit
+        with Circuit(list(copies)) as copyCircuit:
+            result = copyCircuit.get_conversion_result()
+            keptCopies = set(copyCircuit._circuit_component_list)
+        if key is None:
+            return result
+        kept = [comp for comp, copy in zip(comps, copies) if copy in keptCopies]
+        removed = [label for label, copy in zip(compLabels, copies) if copy not in keptCopies]
+        # store the result in canonical labels
+        nodeNames = circuit._get_edge_owners(kept, nets)[1]
+        nodeMap = {name: netLabels[root] for root, (name, number) in nodeNames.items()}
+        compMap = {comp.name: label for comp, label in zip(comps, compLabels)}
+        nodeNumber = {label: int(label[1:]) if label != 'GND' else float('inf') 
+            for label in nodeMap.values()}
+        canonical = _relabel_result(result, nodeMap, compMap, nodeNumber)
+        self._put_entry(key, pickle.dumps((removed, canonical.pack()), pickle.HIGHEST_PROTOCOL))
+        return result
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        if self.directory is not None:
+            path = os.path.join(self.directory, key + '.pkl')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    entry = f.read()
+                self.disk_hits += 1
+                self._put_memory(key, entry)
+        return entry
+
+    def _put_entry(self, key, entry):
+        self._put_memory(key, entry)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, key + '.pkl')
+            # write then rename so readers never see a partial file
+            tmpPath = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmpPath, 'wb') as f:
+                f.write(entry)
+            os.replace(tmpPath, path)
+
+    def _put_memory(self, key, entry):
+        if len(entry) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = entry
+        self._bytes += len(entry)
+        while self._bytes > self.max_bytes:
+            key, old = self._entries.popitem(last=False)
+            self._bytes -= len(old)
+            self.evictions += 1
+
+    # return the key and the canonical labels of the circuit: 
+    # (key, components, nets, component labels 'c<k>' in component order, 
+    # {net representative: node label 'n<k>' or 'GND'}),
+    # the key is None when merging parallel components splits a net
+    def _get_labels(self, circuit):
+        comps = list(circuit._circuit_component_list)
+        nets = circuit.get_nets()
+        groundRoot = nets.find('GND')
+        # nets numbered in order of appearance, ground is 0
+        netIds = {groundRoot: 0}
+        incidence = []
+        counts = []
+        for comp in comps:
+            for t in comp.terminals:
+                root = nets.find(t)
+                if root not in netIds:
+                    netIds[root] = len(netIds)
+                incidence.append(netIds[root])
+            counts.append(len(comp.terminals))
+
+        # everything the conversion reads from a component besides its connectivity
+        descriptions = [repr((comp.label, float(comp.value['capacitance']), 
+            float(comp.value['inductance']), comp.subsystem, len(comp.terminals))) 
+            for comp in comps]
+        colors = {}
+        for description in set(descriptions):
+            digest = hashlib.blake2b(description.encode(), digest_size=8).digest()
+            colors[description] = int.from_bytes(digest, 'little')
+        compBase = np.array([colors[description] for description in descriptions], dtype=np.uint64)
+
+        # refine net colors by their neighbourhoods until no new classes appear
+        # (a stable partition, whatever the component order; a long chain 
+        # takes about half its length in rounds)
+        incNet = np.array(incidence, dtype=np.int64)
+        incComp = np.repeat(np.arange(len(comps)), counts)
+        compSegments = _segments(incComp)
+        netSegments = _segments(incNet)
+        netColor = np.zeros(len(netIds), dtype=np.uint64)
+        netColor[0] = 1
+        classes = 0
+        while True:
+            compColor = _mix(compBase + _segment_sums(_mix(netColor[incNet]), compSegments, len(comps)))
+            netColor = _mix(netColor + _segment_sums(_mix(compColor[incComp]), netSegments, len(netIds)))
+            newClasses = len(np.unique(netColor))
+            if newClasses == classes:
+                break
+            classes = newClasses
+
+        # nets ordered by color, ties by order of appearance
+        netOrder = np.lexsort((np.arange(1, len(netIds)), netColor[1:])) + 1
+        netRank = np.zeros(len(netIds), dtype=np.int64)
+        netRank[netOrder] = np.arange(1, len(netIds))
+        incRank = netRank[incNet].tolist()
+        compKeys = []
+        start = 0
+        for count, description in zip(counts, descriptions):
+            compKeys.append((sorted(incRank[start:start + count]), description))
+            start += count
+        compOrder = sorted(range(len(comps)), key=compKeys.__getitem__)
+
+        # the component kept on each parallel branch depends on component order 
+        # and names the merged edge, it is part of the key so that a hit keeps 
+        # the same one (it has the lowest label of its tied components)
+        position = {id(comp): i for i, comp in enumerate(comps)}
+        groups = circuit._get_parallel_groups(comps, nets.find)
+        keepers = sorted(compKeys[position[id(group[0])]] for group in groups)
+        encoding = repr(([compKeys[i] for i in compOrder], keepers)).encode()
+        key = hashlib.sha256(encoding).hexdigest()
+        # the key only sees nets, not the connection lists that make them up,
+        # so a circuit whose nets change in the merge is converted uncached
+        if groups and self._merge_splits_nets(comps, groups, nets):
+            key = None
+        compLabels = [None] * len(comps)
+        for label, i in enumerate(compOrder):
+            compLabels[i] = 'c' + str(label)
+        netLabels = {root: 'n' + str(netRank[i]) if i else 'GND' for root, i in netIds.items()}
+        return key, comps, nets, compLabels, netLabels
+
+    # check whether the nets after merging the parallel groups differ from nets:
+    # the removed components take their connection lists with them, 
+    # so a net that only they held together falls apart
+    def _merge_splits_nets(self, comps, groups, nets):
+        removed = set()
+        replacement = {}
+        for group in groups:
+            keepTerms = {nets.find(t): t for t in group[0].terminals}
+            for comp in group[1:]:
+                removed.add(id(comp))
+                for t in comp.terminals:
+                    replacement[t] = keepTerms[nets.find(t)]
+        merged = DisjointSet()
+        merged.add('GND')
+        terms = ['GND']
+        for comp in comps:
+            if id(comp) in removed:
+                continue
+            for t in comp.terminals:
+                terms.append(t)
+                merged.add(t)
+                for con in comp.connections[t]:
+                    con = replacement.get(con, con)
+                    merged.add(con)
+                    merged.union(t, con)
+        # merging never joins nets, so equal counts mean equal nets
+        return len({merged.find(t) for t in terms}) != len({nets.find(t) for t in terms})
+
+
+# convert many independent circuits on a pool of worker processes,
+# each circuit is a component list, a ComponentStore or a list of 
+# (name, label, terminals, value, connections, subsystem) records,
+# circuits are sent to the workers as records (stores as they are) 
+# in chunks of chunksize and results come back packed (see ConversionResult.pack),
+# yield ConversionResults in input order, or (index, ConversionResult) 
+# pairs as they finish if ordered is False,
+# processes defaults to the cpu count, 1 converts in this process
+def convert_batch(circuits, processes=None, chunksize=None, ordered=True):
+    if processes is None:
+        processes = os.cpu_count()
+    if chunksize is None:
+        if hasattr(circuits, '__len__'):
+            # same default as Pool.map
+            chunksize, extra = divmod(len(circuits), processes * 4)
+            chunksize += bool(extra) or not chunksize
+        else:
+            chunksize = 1
+    jobs = ((i, _as_records(circuit)) for i, circuit in enumerate(circuits))
+
+    if processes == 1:
+        for job in jobs:
+            i, packed = _convert_packed(job)
+            result = ConversionResult.unpack(packed)
+            yield result if ordered else (i, result)
+        return
+    with Pool(processes) as pool:
+        if ordered:
+            for i, packed in pool.imap(_convert_packed, jobs, chunksize):
+                yield ConversionResult.unpack(packed)
+        else:
+            for i, packed in pool.imap_unordered(_convert_packed, jobs, chunksize):
+                yield i, ConversionResult.unpack(packed)
+
+
+# island-ordered arrays of Circuit.get_island_conversion_result in a pool process
+_island_arrays = None
+
+
+def _set_island_arrays(arrays):
+    global _island_arrays
+    _island_arrays = arrays
+
+
+def _convert_island_range(job):
+    return _convert_island(_get_island_job(_island_arrays, *job))
+
+
+# components of an island job as CSR arrays (as ComponentStore._get_csr), 
+# with their positions in the circuit, their junction flags and the 
+# terminal id of GND (-1 if no terminal is GND)
+_IslandJob = namedtuple('_IslandJob', 'positions junction term_ptr terms con_ptr cons ground')
+
+# what an island job converts to, components as their positions in the circuit 
+# and nets numbered per job (GND is -1): the merged groups (keepers, members 
+# one group after the other, group sizes), the merged-away components, 
+# the nodes as (component, terminal index, net) of their first appearance, 
+# the edges as (net, net, owning component, first component on the edge), 
+# and the number of nets
+_IslandPart = namedtuple('_IslandPart', 'keepers members group_sizes removed '
+    'node_comps node_terms node_nets edge_nets1 edge_nets2 owners creators net_count')
+
+
+# components start:end of the island-ordered arrays (an _IslandJob), 
+# with the pointers rebased to the range
+def _get_island_job(arrays, start, end):
+    termPtr, conPtr = arrays.term_ptr, arrays.con_ptr
+    slotStart = termPtr[start]
+    slotEnd = termPtr[end]
+    return _IslandJob(arrays.positions[start:end], arrays.junction[start:end], 
+        termPtr[start:end + 1] - slotStart, arrays.terms[slotStart:slotEnd], 
+        conPtr[slotStart:slotEnd + 1] - conPtr[slotStart], 
+        arrays.cons[conPtr[slotStart]:conPtr[slotEnd]], arrays.ground)
+
+
+# worker side of Circuit.get_island_conversion_result, converts the components 
+# of one job (whole islands, see _get_island_job) on the arrays to an _IslandPart
+def _convert_island(job):
+    # terminal ids of the job, from 0
+    ids, local = np.unique(np.concatenate((job.terms, job.cons)), return_inverse=True)
+    local = local.reshape(-1)
+    ground = np.searchsorted(ids, job.ground).item()
+    if job.ground < 0 or ground == len(ids) or ids[ground] != job.ground:
+        ground = -1
+    return _convert_terminals(job._replace(terms=local[:len(job.terms)], 
+        cons=local[len(job.terms):], ground=ground), len(ids))
+
+
+# _convert_island on terminal ids that are already below size, 
+# Circuit.iter_edges converts a whole circuit this way
+def _convert_terminals(job, size):
+    labels = _connected_labels(size, np.repeat(job.terms, np.diff(job.con_ptr)), job.cons)
+    keepers, members, sizes, removed, labels = _merge_island_branches(job, size, labels)
+    groundNet = labels[job.ground] if job.ground >= 0 else -1
+    nodeComps, nodeTerms, nodeNets = _get_island_nodes(job, labels, removed, groundNet)
+    net1, net2, owners, creators = _get_island_edges(job, size, labels, removed, groundNet)
+    positions = job.positions
+    return _IslandPart(positions[keepers], positions[members], sizes, positions[removed], 
+        positions[nodeComps], nodeTerms, nodeNets, net1, net2, 
+        positions[owners], positions[creators], size)
+
+
+# (components, net pairs) of the kept two-terminal components of a job 
+# across two nets
+def _get_island_branches(job, size, labels, kept):
+    termPtr, terms = job.term_ptr, job.terms
+    comps = np.flatnonzero((np.diff(termPtr) == 2) & kept)
+    net1 = labels[terms[termPtr[comps]]]
+    net2 = labels[terms[termPtr[comps] + 1]]
+    across = net1 != net2
+    comps, net1, net2 = comps[across], net1[across], net2[across]
+    return comps, np.minimum(net1, net2) * size + np.maximum(net1, net2)
+
+
+# convert_parallel on a job as Circuit._merge_store_rows does it: 
+# (keepers, members, group sizes, removed flags, labels of the nets left)
+def _merge_island_branches(job, size, labels):
+    members, sizes = _get_parallel_members(job, size, labels)
+    removed = np.zeros(len(job.positions), dtype=bool)
+    if not len(members):
+        return members, members, sizes, removed, labels
+    groupStarts = np.cumsum(sizes) - sizes
+    # the first junction of a branch is kept, otherwise its first component
+    candidates = np.where(job.junction[members], np.arange(len(members)), len(members))
+    firstJunctions = np.minimum.reduceat(candidates, groupStarts)
+    keeperIndex = np.where(firstJunctions < len(members), firstJunctions, groupStarts)
+    removed[members] = True
+    removed[members[keeperIndex]] = False
+    remap = _get_merge_remap(job, size, labels, members, sizes, groupStarts, keeperIndex)
+    return (members[keeperIndex], members, sizes, removed, 
+        _get_kept_labels(job, size, removed, remap))
+
+
+# components of the parallel branches of a job, one branch after the other 
+# and in order in each, and the branch sizes
+def _get_parallel_members(job, size, labels):
+    branches, pairs = _get_island_branches(job, size, labels, 
+        np.ones(len(job.positions), dtype=bool))
+    order, pairKeys, starts = _segments(pairs)
+    sizes = np.diff(np.append(starts, len(order)))
+    parallel = sizes > 1
+    return branches[order[_ranges(starts[parallel], starts[parallel] + sizes[parallel])]], sizes[parallel]
+
+
+# terminal id -> id it is replaced by: every terminal of a removed component 
+# goes to the kept terminal on its net, visiting the removed components branch 
+# by branch and in order in each (the last replacement of a terminal wins)
+def _get_merge_remap(job, size, labels, members, sizes, groupStarts, keeperIndex):
+    termPtr, terms = job.term_ptr, job.terms
+    isRemoved = np.ones(len(members), dtype=bool)
+    isRemoved[keeperIndex] = False
+    keptMembers = np.repeat(members[keeperIndex], sizes)[isRemoved]
+    removedMembers = members[isRemoved]
+    visit = np.lexsort((removedMembers, np.repeat(members[groupStarts], sizes)[isRemoved]))
+    keptMembers = keptMembers[visit]
+    removedMembers = removedMembers[visit]
+    replaced = np.stack((terms[termPtr[removedMembers]], terms[termPtr[removedMembers] + 1]), axis=1)
+    keptTerms1 = terms[termPtr[keptMembers], None]
+    target = np.where(labels[replaced] == labels[keptTerms1], keptTerms1, 
+        terms[termPtr[keptMembers] + 1, None])
+    replaced, last = np.unique(replaced.ravel()[::-1], return_index=True)
+    remap = np.arange(size)
+    remap[replaced] = target.ravel()[::-1][last]
+    return remap
+
+
+# net labels of the kept components of a job with their connections remapped 
+# (the removed components take their connection lists with them)
+def _get_kept_labels(job, size, removed, remap):
+    termPtr, conPtr = job.term_ptr, job.con_ptr
+    keptSlots = _ranges(termPtr[:-1][~removed], termPtr[1:][~removed])
+    return _connected_labels(size, 
+        np.repeat(job.terms[keptSlots], conPtr[keptSlots + 1] - conPtr[keptSlots]), 
+        remap[job.cons[_ranges(conPtr[keptSlots], conPtr[keptSlots + 1])]])
+
+
+# the nodes of a job's kept components in order of first appearance, without 
+# GND: (component, terminal index, net) of their first appearance
+def _get_island_nodes(job, labels, removed, groundNet):
+    termPtr = job.term_ptr
+    keptSlots = _ranges(termPtr[:-1][~removed], termPtr[1:][~removed])
+    nets, firsts = np.unique(labels[job.terms[keptSlots]], return_index=True)
+    inside = nets != groundNet
+    firstSlots = keptSlots[firsts[inside]]
+    nodeComps = np.searchsorted(termPtr, firstSlots, side='right') - 1
+    return nodeComps, firstSlots - termPtr[nodeComps], nets[inside]
+
+
+# the edges of a job's kept components as (net, net, owner, first component), 
+# GND is -1, parallel edges to GND are owned by their last component, 
+# others by their first
+def _get_island_edges(job, size, labels, removed, groundNet):
+    termPtr, terms = job.term_ptr, job.terms
+    comps, pairs = _get_island_branches(job, size, labels, ~removed)
+    order, pairKeys, starts = _segments(pairs)
+    firstComps = comps[order[starts]]
+    lastComps = comps[order[starts + np.diff(np.append(starts, len(order))) - 1]]
+    net1 = labels[terms[termPtr[firstComps]]]
+    net2 = labels[terms[termPtr[firstComps] + 1]]
+    owners = np.where((net1 == groundNet) | (net2 == groundNet), lastComps, firstComps)
+    return (np.where(net1 == groundNet, -1, net1), np.where(net2 == groundNet, -1, net2), 
+        owners, firstComps)
+
+
+# number the nodes and edges of the _IslandParts of jobs in circuit order 
+# (count components) the way get_nodes numbers them: (kept positions, 
+# parallel groups as keeper -> member positions, edge owners, lower and higher 
+# node numbers, the number of GND), edges in the order their first component comes
+def _number_island_edges(parts, count):
+    netOffsets = np.cumsum([0] + [part.net_count for part in parts]).tolist()
+    # one field of every part as one array, nets numbered across the parts
+    def joined(field, nets=False):
+        pieces = [getattr(part, field) for part in parts]
+        if nets:
+            pieces = [np.where(pieceNets >= 0, pieceNets + netOffset, -1) 
+                for pieceNets, netOffset in zip(pieces, netOffsets)]
+        return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int64)
+    kept = np.setdiff1d(np.arange(count), joined('removed'))
+
+    # a group's members follow each other
+    groupStarts = np.cumsum(np.append(0, joined('group_sizes'))).tolist()
+    members = joined('members').tolist()
+    groups = {keeper: members[start:end] 
+        for keeper, start, end in zip(joined('keepers').tolist(), groupStarts, groupStarts[1:])}
+
+    # nodes are numbered in order of first appearance, GND is numbered last
+    nodeNets = joined('node_nets', True)
+    numbers = np.zeros(netOffsets[-1] + 1, dtype=np.int64)
+    numbers[nodeNets[np.lexsort((joined('node_terms'), joined('node_comps')))]] = \
+        np.arange(1, len(nodeNets) + 1)
+    numbers[-1] = len(nodeNets) + 1
+    edgeOrder = np.argsort(joined('creators'))
+    numbers1 = numbers[joined('edge_nets1', True)[edgeOrder]]
+    numbers2 = numbers[joined('edge_nets2', True)[edgeOrder]]
+    return (kept, groups, joined('owners')[edgeOrder], np.minimum(numbers1, numbers2), 
+        np.maximum(numbers1, numbers2), len(nodeNets) + 1)
+
+
+# records of a component list, anything else is sent as it is
+def _as_records(circuit):
+    if isinstance(circuit, ComponentStore):
+        return circuit
+    return [comp if isinstance(comp, (tuple, list)) 
+        else (comp.name, comp.label, comp.terminals, comp.value, comp.connections, comp.subsystem) 
+        for comp in circuit]
+
+
+# worker side of convert_batch, values and connection lists are copied 
+# (conversion edits them in place, and in this process they are the caller's)
+def _convert_packed(job):
+    i, circuit = job
+    if not isinstance(circuit, ComponentStore):
+        circuit = [CircuitComponent(name, label, terminals, dict(value), 
+            {t: list(cons) for t, cons in connections.items()}, subsystem) 
+            for name, label, terminals, value, connections, subsystem in circuit]
+    with Circuit(circuit) as circuit:
+        return i, circuit.get_conversion_result().pack()
+
+
+# combined values of groups of parallel components
+def _get_merged_values(groups):
+    return _merge_values([comp.value['capacitance'] for group in groups for comp in group], 
+        [comp.value['inductance'] for group in groups for comp in group], 
+        [len(group) for group in groups])
+
+
+# combined values of groups given one after the other in caps and inds 
+# (sizes of the groups): capacitance adds, inductance adds inversely 
+# (0 means no inductive path), all groups at once with np.add.reduceat, 
+# summed in sorted order so the result does not depend on a group's order
+def _merge_values(caps, inds, sizes):
+    if not len(sizes):
+        return []
+    sizes = np.asarray(sizes)
+    starts = np.cumsum(sizes) - sizes
+    groupIds = np.repeat(np.arange(len(sizes)), sizes)
+    caps = np.asarray(caps)
+    inds = np.asarray(inds)
+    newCaps = np.add.reduceat(caps[np.lexsort((caps, groupIds))], starts)
+    inductive = inds > 0
+    inverses = np.where(inductive, 1 / np.where(inductive, inds, 1), 0)
+    inverseSums = np.add.reduceat(inverses[np.lexsort((inds, groupIds))], starts)
+    counts = np.add.reduceat(inductive.astype(np.int64), starts)
+    # a group's only inductance is kept as it is
+    onlyInds = np.maximum.reduceat(np.where(inductive, inds, 0), starts)
+    return [{'capacitance': cap, 'inductance': 1 / inverseSum if count > 1 else onlyInd if count else 0} 
+        for cap, inverseSum, count, onlyInd in zip(newCaps.tolist(), inverseSums.tolist(), 
+            counts.tolist(), onlyInds.tolist())]
+
+
+# connections of terminal t with removed terminals replaced by the kept ones
+# (duplicates and t itself dropped), None if nothing needs replacing
+def _get_redirected_connections(t, cons, replacement):
+    if not any(c in replacement for c in cons):
+        return None
+    newCons = []
+    seen = {t}
+    for c in cons:
+        c = replacement.get(c, c)
+        if c not in seen:
+            seen.add(c)
+            newCons.append(c)
+    return newCons
+
+
+# give the nodes and component names of result new names, 
+# edges are re-ordered by nodeNumber (lower-numbered node first)
+# and node_tups follows tupOrder if given
+def _relabel_result(result, nodeMap, compMap, nodeNumber, tupOrder=None):
+    def relabel(tup):
+        node1 = nodeMap[tup[0]]
+        node2 = nodeMap[tup[1]]
+        if nodeNumber[node1] < nodeNumber[node2]:
+            return (node1, node2)
+        return (node2, node1)
+    nodeTups = {relabel(tup): (val, compMap[name]) for tup, (val, name) in result.node_tups.items()}
+    if tupOrder is not None:
+        nodeTups = {tup: nodeTups[tup] for tup in tupOrder}
+    capGraph = {}
+    for tup, (val, name) in nodeTups.items():
+        if val['capacitance'] > 0:
+            capGraph.setdefault(tup[0], {})[tup[1]] = val['capacitance']
+    inductorList = [{relabel(tup): ind for tup, ind in ind_dict.items()} 
+        for ind_dict in result.inductor_list]
+    junctionList = [{relabel(tup): compMap[name] for tup, name in junctionDict.items()} 
+        for junctionDict in result.junction_list]
+    # subsystem map entries are nodes, or names of components without an edge
+    subsystemMap = {subsystem: [nodeMap[entry] if entry in nodeMap else compMap[entry] 
+        for entry in entries] for subsystem, entries in result.subsystem_map.items()}
+    return ConversionResult(nodeTups, capGraph, inductorList, junctionList, subsystemMap)
+
+
+# splitmix64 finalizer, scrambles uint64 hashes
+def _mix(x):
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xbf58476d1ce4e5b9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+
+# group positions by key for _segment_sums: (order, keys present, segment starts)
+def _segments(keys):
+    order = np.argsort(keys, kind='stable')
+    uniqueKeys, starts = np.unique(keys[order], return_index=True)
+    return order, uniqueKeys, starts
+
+
+# sum values by key into an array of size entries (uint64, wrapping)
+def _segment_sums(values, segments, size):
+    order, uniqueKeys, starts = segments
+    sums = np.zeros(size, dtype=np.uint64)
+    if len(order):
+        sums[uniqueKeys] = np.add.reduceat(values[order], starts)
+    return sums
+
+
+# concatenation of range(starts[i], ends[i]) for every i, as one array
+def _ranges(starts, ends):
+    counts = ends - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return np.arange(counts.sum(), dtype=np.int64) + offsets
+
+
+# label every item 0..size-1 with the smallest item of its connected component,
+# edges are src[k]-dst[k] (hook each root to the smallest neighbouring root, 
+# then compress, until no edge crosses two components)
+def _connected_labels(size, src, dst):
+    parent = np.arange(size)
+    while True:
+        rootSrc = parent[src]
+        rootDst = parent[dst]
+        crossing = rootSrc != rootDst
+        if not crossing.any():
+            return parent
+        # in place where possible, src and dst can cover a whole circuit
+        rootSrc = rootSrc[crossing]
+        rootDst = rootDst[crossing]
+        del crossing
+        high = np.maximum(rootSrc, rootDst)
+        low = np.minimum(rootSrc, rootDst, out=rootSrc)
+        del rootDst
+        np.minimum.at(parent, high, low)
+        del low, high, rootSrc
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+# index lists of the values of ids that occur more than once,
+# ordered by first occurrence
+def _get_duplicate_groups(ids):
+    order = np.argsort(ids, kind='stable')
+    sortedIds = ids[order]
+    starts = np.flatnonzero(np.concatenate(([True], sortedIds[1:] != sortedIds[:-1])))
+    ends = np.append(starts[1:], len(ids))
+    repeated = ends - starts > 1
+    groups = [order[start:end].tolist() 
+        for start, end in zip(starts[repeated].tolist(), ends[repeated].tolist())]
+    groups.sort()
+    return groups
+
+
+# (offsets, bytes) sections of a string table
+def _string_table(name, strings):
+    data = [string.encode() for string in strings]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in data], out=offsets[1:])
+    return [(name + '_offsets', offsets), 
+        (name + '_bytes', np.frombuffer(b''.join(data), dtype=np.uint8))]
+
+
+# (offsets, entries) sections of a list of int lists
+def _group_table(offsetName, entryName, groups):
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum([len(group) for group in groups], out=offsets[1:])
+    entries = np.array([entry for group in groups for entry in group], dtype=np.int32)
+    return [(offsetName, offsets), (entryName, entries)]
+
+
+# Schur complement of the eliminated rows/columns of a Laplacian, 
+# returned as a dense (len(kept) x len(kept)) array
+def _kron_reduce(matrix, kept, eliminated, sparse):
+    if sparse:
+        # zero-weight edges are stored as explicit zeros
+        matrix = matrix.tocsr(copy=True)
+        matrix.eliminate_zeros()
+        keptRows = matrix[kept]
+        eliminatedRows = matrix[eliminated]
+        reduced = keptRows[:, kept].toarray()
+        coupling = keptRows[:, eliminated].tocsc()
+        block = eliminatedRows[:, eliminated].tocoo()
+        src, dst = block.row, block.col
+        grounded = np.asarray(eliminatedRows.sum(axis=1)).ravel()
+    else:
+        reduced = matrix[np.ix_(kept, kept)]
+        coupling = matrix[np.ix_(kept, eliminated)]
+        block = matrix[np.ix_(eliminated, eliminated)]
+        src, dst = np.nonzero(block)
+        grounded = matrix[eliminated].sum(axis=1)
+    if not len(eliminated):
+        return reduced
+    # groups of eliminated nodes reaching neither a kept node nor GND 
+    # make the block singular and add nothing to the kept nodes, leave them out
+    anchored = (abs(coupling).sum(axis=0) > 0) | (grounded > 1e-12 * block.diagonal())
+    labels = _connected_labels(len(eliminated), src, dst)
+    anchoredLabels = np.zeros(len(eliminated), dtype=bool)
+    anchoredLabels[labels[np.asarray(anchored).ravel()]] = True
+    used = anchoredLabels[labels]
+    if not used.any():
+        return reduced
+    coupling = coupling[:, used]
+    if sparse:
+        from scipy.sparse.linalg import splu
+        block = block.tocsr()[used][:, used].tocsc()
+        solved = splu(block).solve(coupling.T.toarray())
+    else:
+        block = block[np.ix_(used, used)]
+        solved = np.linalg.solve(block, coupling.T)
+    return reduced - coupling @ solved
+
+
+# (node1, node2, weight) edges of a dense Laplacian over nodes, 
+# node pairs in nodes order with GND second,
+# weights at or below tol relative to the largest diagonal entry are dropped
+def _get_reduced_edges(matrix, nodes, tol):
+    if not len(nodes):
+        return []
+    threshold = tol * np.abs(matrix.diagonal()).max()
+    ground = matrix.sum(axis=1)
+    edges = []
+    for i, node1 in enumerate(nodes):
+        for j in np.flatnonzero(-matrix[i, i + 1:] > threshold).tolist():
+            edges.append((node1, nodes[i + 1 + j], float(-matrix[i, i + 1 + j])))
+        if ground[i] > threshold:
+            edges.append((node1, 'GND', float(ground[i])))
+    return edges
+
+
+# build the (size x size) weighted Laplacian of the edges idx1[k]-idx2[k],
+# index -1 is ground and is left out of the matrix
+def _scatter_laplacian(idx1, idx2, weights, size, sparse):
+    inMatrix1 = idx1 >= 0
+    inMatrix2 = idx2 >= 0
+    both = inMatrix1 & inMatrix2
+    rows = np.concatenate((idx1[inMatrix1], idx2[inMatrix2], idx1[both], idx2[both]))
+    cols = np.concatenate((idx1[inMatrix1], idx2[inMatrix2], idx2[both], idx1[both]))
+    data = np.concatenate((weights[inMatrix1], weights[inMatrix2], 
+        -weights[both], -weights[both]))
+    if sparse:
+        from scipy.sparse import coo_matrix
+        # duplicate entries are summed
+        return coo_matrix((data, (rows, cols)), shape=(size, size)).tocsr()
+    matrix = np.zeros((size, size))
+    np.add.at(matrix, (rows, cols), data)
+    return matrix
+
 
 def test():
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
@@ -429,6 +3489,8 @@ def test():
     {'capacitance': 0, 'inductance': 11}, {'I2_1': ['C3_2'], 'I2_2': ['C1_1']}, 'S2') 
      
     circuit1 = Circuit([C1, C2, I1, C3, I2])
+    # same circuit in columnar form
+    store1 = ComponentStore.from_components([C1, C2, I1, C3, I2])
 
     print('Test case 1: nodeTups::')
     nodeT = circuit1.get_nodes()
@@ -441,6 +3503,9 @@ def test():
     print('Ind_List::')
     # [{('n3', 'n4'): 3}, {('n1', 'n5'): 11}]
     print(circuit1.get_inductor_list(nodeT))
+    print('ComponentStore Node Dictionary::')
+    # same as above, with float values
+    print(Circuit(store1).get_nodes())
     print('\n')
 
     circuit1.clear_circuit_component_list()
@@ -510,7 +3575,7 @@ def test():
     circuit_mvp = Circuit([J1, Cq, Cc, Cl])
 
     transmon_alice = Subsystem(name='transmon_alice', sys_label='TRANSMON', 
-        options=None, nodes=['j1'])
+        options=None, nodes=['j1'], circuit=circuit_mvp)
 
     print('MVP circuit: nodeTups::')
     nodeT = circuit_mvp.get_nodes()
@@ -521,6 +3586,23 @@ def test():
     # {'n1': {'GND': 7, 'n2': 5}, 'n2': {'GND': 10}}
     print(circuit_mvp.get_capacitance_graph(nodeT))
 
+    print('Capacitance & Inverse Inductance Matrices::')
+    # ['n1', 'n2'] [[12.0, -5.0], [-5.0, 15.0]] [[0.1, 0.0], [0.0, 0.0]]
+    nodeList, capMatrix, invIndMatrix = circuit_mvp.get_node_matrices(nodeT)
+    print(nodeList, capMatrix.tolist(), invIndMatrix.tolist())
+
+    print('Kron Reduced Graph::')
+    # n2 eliminated: ({'n1': {'GND': 10.333333333333334}}, [{('n1', 'GND'): 10.0}])
+    print(circuit_mvp.get_reduced_graph(nodeT, ['n1']))
+
+    print('Streamed Edges::')
+    # same edges as nodeTups, one at a time
+    print(list(circuit_mvp.iter_edges()))
+
+    print('Connectivity Report::')
+    # R1_1 (the readout resistor) is not part of the circuit
+    print(circuit_mvp.validate_connectivity())
+
     print('Ind_List::')
     # [{('n1', 'GND'): 10}]
     print(circuit_mvp.get_inductor_list(nodeT))
@@ -538,10 +3620,70 @@ def test():
     # {'transmon_alice': ['n1', 'GND'], 'readout_resonator': ['n2', 'GND']}
     print(circuit_mvp.get_subsystem_map(ssDict, nodeT))
 
+    result = circuit_mvp.get_conversion_result(nodeT)
+    print('Conversion Result::')
+    # {'n1': {'GND': 7, 'n2': 5}, 'n2': {'GND': 10}} [{('n1', 'GND'): 10}] [{('n1', 'GND'): 'J1'}]
+    print(result.capacitance_graph, result.inductor_list, result.junction_list)
+
+    # later edits only redo the nodes and edges they touch
+    circuit_mvp.update_conversion_result()
+    Cc.value = {'capacitance': 6, 'inductance': 0}
+    print('Updated Capacitance_Graph::')
+    # {'n1': {'GND': 7, 'n2': 6}, 'n2': {'GND': 10}}
+    print(circuit_mvp.update_conversion_result().capacitance_graph)
+
+    # same topology, coupling capacitance swept over three values
+    sweep = ParameterSweep(circuit_mvp)
+    caps = np.tile([comp.value['capacitance'] for comp in circuit_mvp._circuit_component_list], (3, 1))
+    caps[:, sweep.component_names.index('Cc')] = [4, 5, 6]
+    print('Swept Edge Capacitances::')
+    # [('n1', 'GND'), ('n1', 'n2'), ('n2', 'GND')] [[7. 4. 10.] [7. 5. 10.] [7. 6. 10.]]
+    print(sweep.edges, sweep.edge_values(capacitance=caps)[0])
+
+    # a second conversion of the same circuit comes from the cache
+    cache = ConversionCache()
+    cache.get_conversion_result(circuit_mvp)
+    cache.get_conversion_result(circuit_mvp)
+    print('Cache Stats::')
+    # {'hits': 1, 'disk_hits': 0, 'misses': 1, 'evictions': 0, 'entries': 1, 'bytes': ...}
+    print(cache.get_stats())
+
+    # time the stages of a conversion
+    with circuit_mvp.profile() as profile:
+        circuit_mvp.get_conversion_result()
+    print('Profile Counts::')
+    # {'parallel_groups': 0, 'merged_components': 0, 'nodes': 3, 'edges': 3}
+    print(profile.counts)
+
+    # conversion on an immutable snapshot, each output is computed once on demand
+    snapshot = circuit_mvp.snapshot()
+    print('Snapshot Junction List::')
+    # [{('n1', 'GND'): 'J1'}]
+    print(snapshot.junction_list)
+
+    # a transmon cell defined once, instanced twice and coupled through Cg
+    cell = SubcircuitTemplate('transmon_cell', [
+        CircuitComponent('J', 'junction', ('J_1', 'J_2'), {'capacitance': 2, 'inductance': 10}, 
+            {'J_1': ['GND', 'Cs_1'], 'J_2': ['Cs_2']}, 'transmon'), 
+        CircuitComponent('Cs', 'capacitor', ('Cs_1', 'Cs_2'), {'capacitance': 5, 'inductance': 0}, 
+            {'Cs_1': ['J_1', 'GND'], 'Cs_2': ['J_2']}, 'transmon')], 
+        {'island': 'J_2'})
+    Cg = CircuitComponent('Cg', 'capacitor', ('Cg_1', 'Cg_2'), 
+        {'capacitance': 1, 'inductance': 0}, {'Cg_1': [cell.port_terminal('alice', 'island')], 
+        'Cg_2': [cell.port_terminal('bob', 'island')]}, '')
+    circuit_cells = Circuit(cell.instantiate('alice', {'island': 'Cg_1'}) 
+        + cell.instantiate('bob', {'island': 'Cg_2'}) + [Cg])
+    print('Instanced Cells Connectivity Report::')
+    # no problems, the cells and Cg list each other
+    print(circuit_cells.validate_connectivity())
+    print('Instanced Cells Junction_List::')
+    # [{('n1', 'GND'): 'alice.J'}, {('n2', 'GND'): 'bob.J'}]
+    print(circuit_cells.get_junction_list(circuit_cells.get_nodes()))
+
 
     print('\n')
     circuit_mvp.clear_circuit_component_list()
 
 
-
-test()
\ No newline at end of file
+if __name__ == '__main__':
+    test()
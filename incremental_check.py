@@ -0,0 +1,115 @@
+# Randomized check of Circuit.update_conversion_result
+# Applies random edits (values, subsystems, names, moved terminals) to random
+# circuits and compares each incremental result with a full conversion, e.g.
+#   python incremental_check.py --trials 200 --seed 1
+
+import argparse
+import random
+import sys
+
+from graph_conversion import Circuit, CircuitComponent
+
+# a conversion result with nodes replaced by the terminals on them 
+# (node names and order may differ between the two conversions)
+def canonical(circuit, result):
+    terminals = {}
+    for t, node in circuit._state.terminal_node.items():
+        if t in circuit._terminal_index:
+            terminals.setdefault(node, set()).add(t)
+    key = lambda entry: frozenset(terminals[entry]) if entry in terminals else entry
+    pair = lambda tup: frozenset(map(key, tup))
+    return ({pair(tup): (dict(val), name) for tup, (val, name) in result.node_tups.items()}, 
+        {pair((node1, node2)): cap for node1, caps in result.capacitance_graph.items() 
+            for node2, cap in caps.items()}, 
+        {frozenset((pair(tup), ind) for tup, ind in inds.items()) for inds in result.inductor_list}, 
+        {frozenset((pair(tup), name) for tup, name in juncs.items()) for juncs in result.junction_list}, 
+        {subSys: frozenset(map(key, entries)) for subSys, entries in result.subsystem_map.items()})
+
+
+def reconnect(comp, t, cons):
+    connections = {u: list(v) for u, v in comp.connections.items()}
+    connections[t] = cons
+    comp.connections = connections
+
+
+# two-terminal components on symmetric connections, net 0 is ground
+def random_circuit(rng):
+    nets = [[] for i in range(rng.randint(2, 6))]
+    netOf = {}
+    for i in range(rng.randint(3, 10)):
+        for t, net in zip(('X%d_1' % i, 'X%d_2' % i), rng.sample(range(len(nets)), 2)):
+            nets[net].append(t)
+            netOf[t] = net
+    comps = []
+    for i in range(len(netOf) // 2):
+        label = rng.choice(['capacitor', 'inductor', 'junction'])
+        terms = ('X%d_1' % i, 'X%d_2' % i)
+        comps.append(CircuitComponent('X' + str(i), label, terms, 
+            {'capacitance': rng.randint(0, 5), 'inductance': rng.randint(1, 5) if label != 'capacitor' else 0}, 
+            {t: ['GND'] * (netOf[t] == 0) + [u for u in nets[netOf[t]] if u != t] for t in terms}, 
+            rng.choice(['S1', 'S2', ''])))
+    return Circuit(comps)
+
+
+def random_edit(rng, circuit):
+    comp = rng.choice(circuit._circuit_component_list)
+    edit = rng.randrange(4)
+    if edit == 0:
+        comp.value = {'capacitance': rng.randint(0, 5), 'inductance': comp.value['inductance']}
+    elif edit == 1:
+        comp.subsystem = rng.choice(['S1', 'S2', 'S3', ''])
+    elif edit == 2:
+        comp.name = comp.name + "'"
+    else:
+        # move terminal t onto the node of another terminal
+        t = rng.choice(comp.terminals)
+        target = rng.choice(['GND'] + [u for other in circuit._circuit_component_list 
+            for u in other.terminals if u != t])
+        for u in comp.connections[t]:
+            other = circuit._terminal_index.get(u)
+            if other is not None:
+                reconnect(other, u, [v for v in other.connections[u] if v != t])
+        if target == 'GND':
+            cons = ['GND'] + [u for other in circuit._circuit_component_list 
+                for u in other.terminals if u != t and 'GND' in other.connections[u]]
+        else:
+            cons = [target] + [u for u in circuit._terminal_index[target].connections[target] if u != t]
+        for u in cons:
+            other = circuit._terminal_index.get(u)
+            if other is not None:
+                reconnect(other, u, other.connections[u] + [t])
+        reconnect(comp, t, cons)
+
+
+# number of edits after which the incremental result differs from a full conversion
+def run_check(trials, steps, seed):
+    rng = random.Random(seed)
+    mismatches = 0
+    for trial in range(trials):
+        circuit = random_circuit(rng)
+        circuit.update_conversion_result()
+        for step in range(steps):
+            random_edit(rng, circuit)
+            full = Circuit([CircuitComponent(comp.name, comp.label, tuple(comp.terminals), dict(comp.value), 
+                {t: list(cons) for t, cons in comp.connections.items()}, comp.subsystem) 
+                for comp in circuit._circuit_component_list])
+            if canonical(circuit, circuit.update_conversion_result()) \
+                    != canonical(full, full.update_conversion_result()):
+                mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare incremental and full conversions on random edits.')
+    parser.add_argument('--trials', type=int, default=50, help='number of random circuits')
+    parser.add_argument('--steps', type=int, default=5, help='edits per circuit')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mismatches = run_check(args.trials, args.steps, args.seed)
+    print('Incremental vs Full Mismatches:: %d of %d edits' % (mismatches, args.trials * args.steps))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
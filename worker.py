@@ -0,0 +1,308 @@
+# Resident conversion worker
+# Reads one JSON circuit per line from stdin (or a local Unix socket) and writes
+# one JSON result per line as each conversion finishes, conversions run
+# concurrently on a pool of warm worker processes, e.g.
+#   python worker.py --workers 4 < circuits.jsonl > results.jsonl
+#   python worker.py --socket /tmp/graph_conversion.sock
+#
+# request:
+#   {"id": 1, "timeout": 5, "components": [{"name": "C1", "label": "capacitor",
+#    "terminals": ["C1_1", "C1_2"], "value": {"capacitance": 4, "inductance": 0},
+#    "connections": {"C1_1": ["GND"], "C1_2": []}, "subsystem": "qubit"}, ...]}
+# response (in completion order, matched by id):
+#   {"id": 1, "ok": true, "nodes": [["n1", "GND", {"capacitance": 4, "inductance": 0}, "C1"]],
+#    "capacitance_graph": {"n1": {"GND": 4}}, "inductor_list": [[["n1", "GND", 10]]],
+#    "junction_list": [[["n1", "GND", "J1"]]], "subsystem_map": {"qubit": ["n1", "GND"]}}
+#   {"id": 1, "ok": false, "error": "..."}
+# a conversion that times out is stopped by replacing the process pool, 
+# conversions running beside it are converted again on the new one
+# with "validate": true in the request (or --validate) circuits with connectivity
+# problems are rejected before converting:
+#   {"id": 1, "ok": false, "error": "invalid circuit",
+#    "problems": {"unknown_terminals": [["Cc", "Cc_2", "R1_1"]], ...}}
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from graph_conversion import Circuit, CircuitComponent, ConversionCache
+
+# per-process conversion cache, set by _init_process when enabled
+_cache = None
+
+
+# pids reports the process id, so the pool can be stopped by killing its processes
+def _init_process(cacheBytes, pids):
+    global _cache
+    pids.put(os.getpid())
+    if cacheBytes:
+        _cache = ConversionCache(max_bytes=cacheBytes)
+
+
+# JSON form of a ConversionResult (edge tuples become lists)
+def result_to_json(result):
+    return {
+        'nodes': [[node1, node2, val, name]
+            for (node1, node2), (val, name) in result.node_tups.items()],
+        'capacitance_graph': result.capacitance_graph,
+        'inductor_list': [[[node1, node2, ind] for (node1, node2), ind in ind_dict.items()]
+            for ind_dict in result.inductor_list],
+        'junction_list': [[[node1, node2, name] for (node1, node2), name in junctionDict.items()]
+            for junctionDict in result.junction_list],
+        'subsystem_map': result.subsystem_map,
+    }
+
+
+# runs in the worker processes, 
+# with validate circuits with connectivity problems are rejected unconverted
+def convert_components(components, validate=False):
+    # the circuit and its components are released before the next request
+    with Circuit([CircuitComponent(comp['name'], comp['label'],
+        tuple(comp['terminals']), comp['value'], comp['connections'],
+        comp.get('subsystem')) for comp in components]) as circuit:
+        if validate:
+            report = circuit.validate_connectivity()
+            if not report.ok:
+                return {'ok': False, 'error': 'invalid circuit', 'problems': report.as_dict()}
+        if _cache is not None:
+            return result_to_json(_cache.get_conversion_result(circuit))
+        return result_to_json(circuit.get_conversion_result())
+
+
+# stdout as a stream writer, writes block until the reader takes the data
+class _PipeWriter(object):
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data):
+        self._stream.write(data)
+        self._stream.flush()
+
+    async def drain(self):
+        pass
+
+
+# a redirected file as a stream reader, lines are read on a thread 
+# (pipes and terminals are read by the event loop, see serve_stdin), 
+# a line longer than max_line is skipped and raises ValueError as it does 
+# on asyncio.StreamReader
+class _FileReader(object):
+
+    def __init__(self, stream, max_line):
+        self._stream = stream
+        self.max_line = max_line
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self._read_line)
+
+    def _read_line(self):
+        line = self._stream.readline(self.max_line + 1)
+        if len(line) <= self.max_line or line.endswith(b'\n'):
+            return line
+        # the rest of the line is read a chunk at a time
+        while line and not line.endswith(b'\n'):
+            line = self._stream.readline(self.max_line + 1)
+        raise ValueError('line longer than ' + str(self.max_line) + ' bytes')
+
+
+class ConversionWorker(object):
+
+    def __init__(self, workers=None, max_pending=None, timeout=60.0,
+        cache_bytes=0, max_line=64 * 2**20, validate=False):
+        workers = workers or os.cpu_count() or 1
+        self.workers = workers
+        self.cache_bytes = cache_bytes
+        # start the processes now so requests never wait for interpreter start-up
+        self._executor, self._pids = self._start_executor()
+        # requests read but not answered yet, reading stops at this many
+        self.max_pending = max_pending or 4 * workers
+        self._slots = asyncio.Semaphore(self.max_pending)
+        # default per-request timeout in seconds (a request's "timeout" overrides it)
+        self.timeout = timeout
+        self.max_line = max_line
+        # default for validating circuits first (a request's "validate" overrides it)
+        self.validate = validate
+
+    # a new pool and the queue its processes report their ids on, 
+    # spawned rather than forked: a forked child closing its copy of stdin 
+    # would block on the lock held by a thread reading it
+    def _start_executor(self):
+        context = multiprocessing.get_context('spawn')
+        pids = context.Queue()
+        executor = ProcessPoolExecutor(self.workers, mp_context=context,
+            initializer=_init_process, initargs=(self.cache_bytes, pids))
+        # warm up the processes without waiting for them
+        for i in range(self.workers):
+            executor.submit(int)
+        return executor, pids
+
+    # kill the processes that reported on pids (a process that has not 
+    # reported yet has not taken a conversion either, and exits on shutdown)
+    def _kill_processes(self, pids):
+        while True:
+            try:
+                pid = pids.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        pids.close()
+
+    # replace the pool with a new one and kill its processes, 
+    # the only way to stop a conversion that timed out (the conversions still 
+    # running on it fail with BrokenProcessPool and are submitted again)
+    def _recycle(self, executor):
+        if executor is not self._executor:
+            return
+        pids = self._pids
+        self._executor, self._pids = self._start_executor()
+        self._kill_processes(pids)
+        executor.shutdown(wait=False)
+
+    # stop without waiting for running conversions
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._kill_processes(self._pids)
+
+    # answer every request line of reader on writer until end of input
+    async def serve_stream(self, reader, writer):
+        tasks = set()
+        while True:
+            # backpressure: stop reading while max_pending requests are in flight
+            await self._slots.acquire()
+            try:
+                line = await reader.readline()
+            except ValueError as e:
+                # line longer than max_line
+                task = asyncio.ensure_future(self._respond(writer,
+                    {'id': None, 'ok': False, 'error': str(e)}))
+            else:
+                if not line:
+                    self._slots.release()
+                    break
+                if not line.strip():
+                    self._slots.release()
+                    continue
+                task = asyncio.ensure_future(self._handle(line, writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_stdin(self):
+        try:
+            # pipes and terminals are read by the event loop rather than on a 
+            # thread, so SIGTERM stops the worker while stdin is still open
+            reader = asyncio.StreamReader(limit=self.max_line)
+            await asyncio.get_running_loop().connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+        except ValueError:
+            # a regular file, which a read never waits on
+            reader = _FileReader(sys.stdin.buffer, self.max_line)
+        await self.serve_stream(reader, _PipeWriter(sys.stdout.buffer))
+
+    async def serve_socket(self, path):
+        async def serve_connection(reader, writer):
+            try:
+                await self.serve_stream(reader, writer)
+            finally:
+                writer.close()
+        # a socket file left behind by an earlier worker
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(serve_connection, path, limit=self.max_line)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    async def _handle(self, line, writer):
+        requestId = None
+        try:
+            request = json.loads(line)
+            requestId = request.get('id')
+            timeout = request.get('timeout', self.timeout)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout if timeout is not None else None
+            while True:
+                executor = self._executor
+                future = loop.run_in_executor(executor, convert_components, 
+                    request['components'], request.get('validate', self.validate))
+                try:
+                    result = await asyncio.wait_for(future, 
+                        deadline - loop.time() if deadline is not None else None)
+                except asyncio.TimeoutError:
+                    # the conversion would keep its process busy until it ends
+                    self._recycle(executor)
+                    raise
+                except BrokenProcessPool:
+                    # killed for another request's timeout, convert it again,
+                    # a pool that broke by itself is replaced as well
+                    if executor is not self._executor:
+                        continue
+                    self._recycle(executor)
+                    raise
+                break
+            response = {'id': requestId, 'ok': True}
+            response.update(result)
+        except asyncio.TimeoutError:
+            response = {'id': requestId, 'ok': False,
+                'error': 'conversion timed out after ' + str(timeout) + ' s'}
+        except Exception as e:
+            response = {'id': requestId, 'ok': False, 'error': type(e).__name__ + ': ' + str(e)}
+        await self._respond(writer, response)
+
+    async def _respond(self, writer, response):
+        try:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+        finally:
+            self._slots.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert JSON-lines circuits with a resident worker pool.')
+    parser.add_argument('--socket', help='listen on this Unix socket instead of stdin/stdout')
+    parser.add_argument('--workers', type=int, help='conversion processes (default: CPU count)')
+    parser.add_argument('--max-pending', type=int,
+        help='requests in flight before reading pauses (default: 4 per worker)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='default per-request timeout in seconds')
+    parser.add_argument('--cache-mb', type=float, default=0,
+        help='per-process ConversionCache size in MiB (0 disables it)')
+    parser.add_argument('--validate', action='store_true',
+        help='reject circuits with connectivity problems before converting them')
+    args = parser.parse_args(argv)
+
+    async def run():
+        # stop cleanly (closing the pool, removing the socket) on SIGTERM
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        worker = ConversionWorker(args.workers, args.max_pending, args.timeout,
+            int(args.cache_mb * 2**20), validate=args.validate)
+        try:
+            if args.socket:
+                await worker.serve_socket(args.socket)
+            else:
+                await worker.serve_stdin()
+        finally:
+            worker.close()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == '__main__':
+    main()